@@ -0,0 +1,215 @@
+# alt.py
+# A* + 地標 (ALT: A*, Landmarks, Triangle inequality)
+#
+# 預處理：選 k 個地標 L，算出每個星球 v 的 d(L, v) 與 d(v, L)。
+# 查詢：由三角不等式得到 d(v, t) 的下界
+#     d(v, t) >= d(L, t) - d(L, v)      d(v, t) >= d(v, L) - d(t, L)
+# 以此為 A* 的啟發函數，只需要 settle 起點與終點之間的一小部分星球。
+# 預處理結果存成 <map>.alt，與 JSON + 變更記錄的雜湊 (changelog.digest) 綁定。
+
+import heapq
+import os
+import random
+import struct
+from array import array
+
+import changelog
+import csr
+import snapshot
+
+MAGIC = b"SPMAPALT"
+VERSION = 1
+HEADER = struct.Struct("<8sHxxI32s32sII")
+UNREACHABLE = -1
+
+
+def alt_path(filename):
+    return os.path.splitext(filename)[0] + ".alt"
+
+
+def _to_array(dist):
+    inf = float('inf')
+    return array('i', (UNREACHABLE if d == inf else d for d in dist))
+
+
+# ----------------------------
+# Preprocessing
+# ----------------------------
+
+def preprocess(graph, k=8, seed=None, reverse=None):
+    """
+    graph 可以是 dict-of-lists 或 CSR；回傳的索引內含 CSR 版本的圖，查詢時直接使用。
+    地標以「最遠點」策略挑選：每次選離現有地標最遠（且可抵達）的星球。
+    """
+    g = csr.from_graph(graph)
+    r = reverse if csr.is_csr(reverse) else csr.reverse(g)
+    n = csr.num_planets(g)
+    rng = random.Random(seed)
+
+    landmarks = []
+    from_lm = []
+    to_lm = []
+    closest = [float('inf')] * n  # 每個星球到最近地標的距離 (雙向取小)
+    candidate = rng.randrange(n) if n else -1
+    while candidate != -1 and len(landmarks) < min(k, n):
+        fwd, _ = csr.dijkstra_ids(g, candidate)
+        bwd, _ = csr.dijkstra_ids(r, candidate)
+        landmarks.append(candidate)
+        from_lm.append(_to_array(fwd))
+        to_lm.append(_to_array(bwd))
+
+        best = -1
+        best_d = -1
+        for v in range(n):
+            d = min(closest[v], fwd[v], bwd[v])
+            closest[v] = d
+            if d != float('inf') and d > best_d:
+                best_d = d
+                best = v
+        if best_d <= 0:
+            # 其餘星球都已經是地標或無法抵達，改從未涵蓋的星球隨機挑
+            rest = [v for v in range(n) if closest[v] == float('inf')]
+            best = rng.choice(rest) if rest else -1
+        candidate = best
+
+    return {"kind": "alt", "graph": g, "landmarks": landmarks,
+            "from_lm": from_lm, "to_lm": to_lm}
+
+
+# ----------------------------
+# Persistence
+# ----------------------------
+
+def save(index, filename):
+    path = alt_path(filename)
+    g = index["graph"]
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, csr.num_planets(g), changelog.digest(filename),
+                            snapshot.names_digest(g["names"]), len(index["landmarks"]), 0))
+        array('i', index["landmarks"]).tofile(f)
+        for arr in index["from_lm"] + index["to_lm"]:
+            arr.tofile(f)
+    os.replace(tmp, path)
+    return path
+
+
+def load(filename, graph):
+    """<map>.alt 存在且與目前地圖相符時回傳索引，否則回傳 None"""
+    path = alt_path(filename)
+    if not os.path.exists(path) or not os.path.exists(filename):
+        return None
+    g = csr.from_graph(graph)
+    n = csr.num_planets(g)
+    with open(path, "rb") as f:
+        head = f.read(HEADER.size)
+        if len(head) < HEADER.size:
+            return None
+        magic, version, num, digest, order_digest, k, _ = HEADER.unpack(head)
+        if magic != MAGIC or version != VERSION or num != n:
+            return None
+        if digest != changelog.digest(filename) or order_digest != snapshot.names_digest(g["names"]):
+            return None
+        try:
+            landmarks = array('i')
+            landmarks.fromfile(f, k)
+            tables = []
+            for _ in range(2 * k):
+                arr = array('i')
+                arr.fromfile(f, n)
+                tables.append(arr)
+        except EOFError:
+            return None
+    return {"kind": "alt", "graph": g, "landmarks": list(landmarks),
+            "from_lm": tables[:k], "to_lm": tables[k:]}
+
+
+def load_or_build(filename, graph, k=8):
+    index = load(filename, graph)
+    if index is None:
+        index = preprocess(graph, k=k)
+        try:
+            save(index, filename)
+        except OSError as e:
+            print("無法寫入 ALT 索引：", e)
+    return index
+
+
+# ----------------------------
+# Query
+# ----------------------------
+
+def _heuristic(index, t):
+    # 回傳 h(v)；下界為 None 表示 v 一定到不了 t
+    pairs = []
+    for fl, tl in zip(index["from_lm"], index["to_lm"]):
+        pairs.append((fl, fl[t], tl, tl[t]))
+
+    def h(v):
+        best = 0
+        for fl, fl_t, tl, tl_t in pairs:
+            fl_v = fl[v]
+            if fl_v != UNREACHABLE:
+                if fl_t == UNREACHABLE:
+                    return None  # L 到得了 v 卻到不了 t
+                if fl_t - fl_v > best:
+                    best = fl_t - fl_v
+            tl_v = tl[v]
+            if tl_t != UNREACHABLE:
+                if tl_v == UNREACHABLE:
+                    return None  # t 到得了 L 但 v 到不了
+                if tl_v - tl_t > best:
+                    best = tl_v - tl_t
+        return best
+
+    return h
+
+
+def astar(index, start, goal, stats=None):
+    """
+    與 dijkstra 相同的 (dist, prev) 介面，只包含 A* 探索過的星球；
+    stats 為 dict 時會寫入 settled（被 settle 的星球數）。
+    """
+    g = index["graph"]
+    names_index = g["index"]
+    if start not in names_index or goal not in names_index:
+        return {}, {}
+    s = names_index[start]
+    t = names_index[goal]
+    offsets = g["offsets"]
+    targets = g["targets"]
+    weights = g["weights"]
+    h = _heuristic(index, t)
+
+    dist = {s: 0}
+    parent = {s: -1}
+    done = set()
+    hcache = {}
+    hs = h(s)
+    heap = [] if hs is None else [(hs, 0, s)]
+    while heap:
+        _, d, u = heapq.heappop(heap)
+        if u in done or d > dist[u]:
+            continue
+        done.add(u)
+        if u == t:
+            break
+        for e in range(offsets[u], offsets[u + 1]):
+            v = targets[e]
+            alt = d + weights[e]
+            if alt < dist.get(v, float('inf')):
+                if v in hcache:
+                    hv = hcache[v]
+                else:
+                    hv = hcache[v] = h(v)
+                if hv is None:
+                    continue
+                dist[v] = alt
+                parent[v] = u
+                heapq.heappush(heap, (alt + hv, alt, v))
+
+    if stats is not None:
+        stats["settled"] = len(done)
+    names = g["names"]
+    return ({names[v]: d for v, d in dist.items()},
+            {names[v]: (names[p] if p != -1 else None) for v, p in parent.items()})
@@ -0,0 +1,184 @@
+# apsp.py
+# 平行計算所有起點的最低燃料 (all-pairs shortest paths)，結果寫進 mmap 的距離矩陣 <map>.dist
+#
+# - 圖的 CSR 陣列只複製一次到 multiprocessing.shared_memory，worker 直接掛上去讀，不經過 pickle
+# - 起點分批交給 process pool，每個 worker 跑 csr.dijkstra_ids，算完的那一列直接寫進 mmap 檔
+#   (不傳回主程序)，主程序只收進度
+# - 每一列寫完後才標記完成，中斷後重新執行會跳過已完成的列
+#
+# 檔案格式：
+#   header   struct HEADER (magic, version, byteorder, 星球數, names_digest, changelog.digest)
+#   done     uint8 * n，補齊到 8 的倍數        第 i 列是否已完成
+#   rows     int32 * n * n                     第 s 列第 t 欄為 s -> t 的最低燃料，無法抵達為 -1
+#
+# 與 JSON + 變更記錄的雜湊 (changelog.digest) 綁定：航道燃料改變但星球不變時，舊的列不能沿用。
+#
+# 執行方式：python main.py apsp space_map.json [--workers 8]
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+import changelog
+import csr
+import snapshot
+
+MAGIC = b"SPMAPDST"
+VERSION = 2
+HEADER = struct.Struct("<8sHB5xQ32s32s")
+UNREACHABLE = -1
+_BYTEORDER = {"little": 0, "big": 1}[sys.byteorder]
+
+
+def matrix_path(filename):
+    return os.path.splitext(filename)[0] + ".dist"
+
+
+def _layout(n):
+    done_at = HEADER.size
+    rows_at = done_at + n + (-n) % 8
+    return done_at, rows_at, rows_at + 4 * n * n
+
+
+# ----------------------------
+# Matrix file
+# ----------------------------
+
+def _open_or_create(path, names, map_digest):
+    # 同一份地圖 (內容與星球順序都相同) 的舊檔案沿用，以便接續；否則重新建立
+    n = len(names)
+    digest = snapshot.names_digest(names)
+    size = _layout(n)[2]
+    if os.path.exists(path) and os.path.getsize(path) == size:
+        with open(path, "rb") as f:
+            head = HEADER.unpack(f.read(HEADER.size))
+        if head == (MAGIC, VERSION, _BYTEORDER, n, digest, map_digest):
+            return
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, _BYTEORDER, n, digest, map_digest))
+        f.truncate(size)
+
+
+def load(path, names=None, filename=None):
+    """
+    mmap 開啟距離矩陣；names 有提供時檢查星球順序是否一致，
+    filename 有提供時檢查是否對應該地圖目前的內容 (changelog.digest)，不一致回傳 None。
+    回傳 {"n", "done", "rows", "mmap"}，done / rows 為指向 mmap 的 memoryview。
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        head = f.read(HEADER.size)
+        if len(head) < HEADER.size:
+            return None
+        magic, version, byteorder, n, digest, map_digest = HEADER.unpack(head)
+        if magic != MAGIC or version != VERSION or byteorder != _BYTEORDER:
+            return None
+        if names is not None and (n != len(names) or digest != snapshot.names_digest(names)):
+            return None
+        if filename is not None and map_digest != changelog.digest(filename):
+            return None
+        if os.path.getsize(path) != _layout(n)[2]:
+            return None
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    done_at, rows_at, size = _layout(n)
+    view = memoryview(mm)
+    return {"n": n, "done": view[done_at:done_at + n], "rows": view[rows_at:size].cast('i'),
+            "mmap": mm}
+
+
+def distance(matrix, s, t):
+    """以整數 ID 查 s -> t 的最低燃料；無法抵達或該列尚未計算時為 inf"""
+    if not matrix["done"][s]:
+        return float('inf')
+    d = matrix["rows"][s * matrix["n"] + t]
+    return float('inf') if d == UNREACHABLE else d
+
+
+# ----------------------------
+# Worker side
+# ----------------------------
+
+_graph = None
+_blocks = None
+_out = None
+
+
+def _worker_init(shm_names, n, m, path):
+    global _graph, _blocks, _out
+    _blocks = [SharedMemory(name=name) for name in shm_names]
+    _graph = {"names": range(n),
+              "offsets": _blocks[0].buf[:4 * (n + 1)].cast('i'),
+              "targets": _blocks[1].buf[:4 * m].cast('i'),
+              "weights": _blocks[2].buf[:4 * m].cast('i')}
+    f = open(path, "r+b")
+    _out = mmap.mmap(f.fileno(), 0)
+    f.close()
+
+
+def _worker_rows(sources):
+    n = len(_graph["names"])
+    done_at, rows_at, _ = _layout(n)
+    inf = float('inf')
+    for s in sources:
+        dist, _ = csr.dijkstra_ids(_graph, s)
+        row = array('i', [UNREACHABLE if d == inf else d for d in dist])
+        at = rows_at + 4 * n * s
+        _out[at:at + 4 * n] = row.tobytes()
+        _out[done_at + s] = 1
+    return len(sources)
+
+
+# ----------------------------
+# Driver
+# ----------------------------
+
+def _share(data):
+    raw = memoryview(data).cast('B')
+    block = SharedMemory(create=True, size=max(len(raw), 1))
+    block.buf[:len(raw)] = raw
+    return block
+
+
+def run(graph, path, filename, workers=None, chunk=16, log=print):
+    """
+    計算 graph 所有起點的最低燃料並寫入 path；回傳這次計算的列數。
+    graph 可以是 dict-of-lists 或 CSR，矩陣的列 / 欄順序與 CSR 的星球 ID 相同。
+    filename 為 graph 來源的地圖 JSON，只有內容雜湊相符的舊矩陣才會接續計算。
+    """
+    g = csr.from_graph(graph)
+    n = len(g["names"])
+    m = len(g["targets"])
+    _open_or_create(path, g["names"], changelog.digest(filename))
+    with open(path, "rb") as f:
+        done_at = _layout(n)[0]
+        f.seek(done_at)
+        done = f.read(n)
+    todo = [s for s in range(n) if not done[s]]
+    if not todo:
+        log(f"{path} 已經完整，不需重新計算")
+        return 0
+    workers = workers or os.cpu_count() or 1
+    log(f"計算 {len(todo)}/{n} 列，{workers} 個 worker，矩陣 {_layout(n)[2] / (1 << 20):.1f} MB -> {path}")
+
+    blocks = [_share(g[key]) for key in ("offsets", "targets", "weights")]
+    try:
+        batches = [todo[i:i + chunk] for i in range(0, len(todo), chunk)]
+        finished = 0
+        step = max(1, len(todo) // 20)
+        with Pool(workers, initializer=_worker_init,
+                  initargs=([b.name for b in blocks], n, m, path)) as pool:
+            for count in pool.imap_unordered(_worker_rows, batches):
+                before = finished
+                finished += count
+                if finished // step != before // step or finished == len(todo):
+                    log(f"  {finished}/{len(todo)} 列")
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return len(todo)
@@ -0,0 +1,145 @@
+# batch.py
+# 批次查詢：一次處理大量 (起點, 終點) 的最低燃料查詢
+#
+# 查詢依起點分組，每個不同的起點只跑一次完整的 Dijkstra，
+# 同一起點的所有終點都從這棵最短路徑樹取答案，結果以 JSONL 逐行輸出。
+# SQLite 圖 (sqlstore.py) 不跑完整的 Dijkstra，該組的終點都 settle 後就停止。
+#
+# 查詢檔每行一筆，可以是 "Planet_0 Planet_5" 或 {"start": "Planet_0", "goal": "Planet_5"}；
+# 空白行與 # 開頭的行會被略過。
+#
+# 執行方式：python batch.py space_map.json queries.txt [results.jsonl]
+
+import json
+import sys
+from time import perf_counter
+
+import csr
+import probe
+import sqlstore
+
+
+def read_queries(lines):
+    """回傳 [(start, goal), ...]"""
+    queries = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("{"):
+            q = json.loads(line)
+            queries.append((q["start"], q["goal"]))
+        else:
+            start, goal = line.split()
+            queries.append((start, goal))
+    return queries
+
+
+def group_by_source(queries):
+    # {start: [(查詢編號, goal), ...]}，保留每個起點第一次出現的順序
+    groups = {}
+    for i, (start, goal) in enumerate(queries):
+        groups.setdefault(start, []).append((i, goal))
+    return groups
+
+
+def _path(parent, names, t):
+    path = []
+    while t != -1:
+        path.append(names[t])
+        t = parent[t]
+    path.reverse()
+    return path
+
+
+def run_batch(graph, queries, out, with_path=True):
+    """
+    graph 可以是 dict-of-lists、CSR 或 SQLite 圖；out 為可寫入的文字檔。
+    每筆結果一行 JSON：{"id", "start", "goal", "fuel", "path"}，無法抵達時 fuel 為 null。
+    回傳實際執行的 Dijkstra 次數。
+    """
+    if sqlstore.is_store(graph):
+        return _run_store(graph, queries, out, with_path)
+    g = csr.from_graph(graph)
+    index = g["index"]
+    names = g["names"]
+    inf = float('inf')
+    runs = 0
+
+    for start, items in group_by_source(queries).items():
+        if start in index and probe.enabled:
+            stats = {}
+            t0 = perf_counter()
+            dist, parent = csr.dijkstra_ids(g, index[start], stats=stats)
+            probe.record("dijkstra", start, None, stats, perf_counter() - t0)
+            runs += 1
+        elif start in index:
+            dist, parent = csr.dijkstra_ids(g, index[start])
+            runs += 1
+        else:
+            dist = parent = None
+        lines = []
+        for i, goal in items:
+            t = index.get(goal, -1)
+            fuel = dist[t] if dist is not None and t != -1 else inf
+            result = {"id": i, "start": start, "goal": goal,
+                      "fuel": None if fuel == inf else fuel}
+            if with_path:
+                result["path"] = [] if fuel == inf else _path(parent, names, t)
+            lines.append(json.dumps(result, ensure_ascii=False))
+        out.write("\n".join(lines) + "\n")
+    return runs
+
+
+def _run_store(store, queries, out, with_path):
+    inf = float('inf')
+    runs = 0
+    for start, items in group_by_source(queries).items():
+        s = sqlstore.planet_id(store, start)
+        ids = {goal: sqlstore.planet_id(store, goal) for _, goal in items}
+        targets = [t for t in ids.values() if t != -1]
+        dist = parent = {}
+        if s != -1 and targets:
+            stats = {} if probe.enabled else None
+            t0 = perf_counter()
+            dist, parent = sqlstore.dijkstra_ids(store, s, targets, stats)
+            if stats is not None:
+                probe.record("dijkstra", start, None, stats, perf_counter() - t0)
+            runs += 1
+        paths = {}
+        if with_path:
+            for t in targets:
+                if t in dist:
+                    path = [t]
+                    while parent[path[-1]] != -1:
+                        path.append(parent[path[-1]])
+                    paths[t] = path[::-1]
+            names = sqlstore.names_of(store, {v for p in paths.values() for v in p})
+        lines = []
+        for i, goal in items:
+            fuel = dist.get(ids[goal], inf)
+            result = {"id": i, "start": start, "goal": goal,
+                      "fuel": None if fuel == inf else fuel}
+            if with_path:
+                result["path"] = [names[v] for v in paths[ids[goal]]] if fuel != inf else []
+            lines.append(json.dumps(result, ensure_ascii=False))
+        out.write("\n".join(lines) + "\n")
+    return runs
+
+
+if __name__ == '__main__':
+    import main
+    if len(sys.argv) < 3:
+        print("用法：python batch.py <map>.json <queries.txt> [results.jsonl]")
+        sys.exit(1)
+    _, graph = main.load_space_map(sys.argv[1], backend="csr")
+    if graph is None:
+        sys.exit(1)
+    with open(sys.argv[2], "r", encoding="utf-8") as f:
+        queries = read_queries(f)
+    if len(sys.argv) > 3:
+        with open(sys.argv[3], "w", encoding="utf-8") as out:
+            runs = run_batch(graph, queries, out)
+    else:
+        runs = run_batch(graph, queries, sys.stdout)
+    print(f"{len(queries)} 筆查詢，{runs} 次 Dijkstra", file=sys.stderr)
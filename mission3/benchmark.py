@@ -0,0 +1,250 @@
+# benchmark.py
+# 效能測試
+#   suite     各演算法在 10^2 ~ 10^6 個星球的規模測試，輸出 JSON 並與 baseline 比較
+#   dijkstra  舊版 O(V^2) 掃描 vs. 二元堆積 O(E log V)
+#   dynamic   航道編輯後，增量修復最短路徑樹 vs. 重新計算的成本
+#
+# 執行方式：
+#   python benchmark.py suite --output bench_results.json
+#   python benchmark.py suite --baseline bench_baseline.json   (變慢超過門檻時 exit code 為 1)
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import tracemalloc
+from datetime import datetime
+from time import perf_counter
+
+import dynamic
+import namesort
+from main import (binary_search, bfs_path, build_reverse_index, dijkstra, linear_search,
+                  quicksort, selection_sort)
+
+
+# ----------------------------
+# Reference: 舊版線性掃描 Dijkstra（僅供比較）
+# ----------------------------
+
+def dijkstra_scan(graph, start):
+    dist = {node: float('inf') for node in graph}
+    prev = {node: None for node in graph}
+    dist[start] = 0
+    visited = set()
+
+    while len(visited) < len(graph):
+        candidates = [n for n in graph if n not in visited]
+        if not candidates:
+            break
+        u = min(candidates, key=lambda x: dist[x])
+        if dist[u] == float('inf'):
+            break
+        visited.add(u)
+        for v, w in graph.get(u, []):
+            alt = dist[u] + w
+            if alt < dist[v]:
+                dist[v] = alt
+                prev[v] = u
+    return dist, prev
+
+
+# ----------------------------
+# Helpers
+# ----------------------------
+
+def random_graph(num_planets, num_routes, seed=0):
+    rng = random.Random(seed)
+    planets = [f"Planet_{i}" for i in range(num_planets)]
+    graph = {p: [] for p in planets}
+    for _ in range(num_routes):
+        a = rng.randrange(num_planets)
+        b = rng.randrange(num_planets)
+        if a != b:
+            graph[planets[a]].append((planets[b], rng.randint(1, 50)))
+    return planets, graph
+
+
+def time_call(fn, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = perf_counter()
+        fn(*args)
+        best = min(best, perf_counter() - t0)
+    return best
+
+
+# ----------------------------
+# Main
+# ----------------------------
+
+def run(sizes=(250, 500, 1000, 2000, 4000), routes_per_planet=4, scan_limit=4000):
+    print(f"{'V':>8} {'E':>9} {'scan (s)':>10} {'heap (s)':>10} {'speedup':>8}")
+    for n in sizes:
+        planets, graph = random_graph(n, n * routes_per_planet, seed=n)
+        src = planets[0]
+        heap_t = time_call(dijkstra, graph, src)
+        if n <= scan_limit:
+            scan_t = time_call(dijkstra_scan, graph, src, repeat=1)
+            assert dijkstra_scan(graph, src)[0] == dijkstra(graph, src)[0]
+            print(f"{n:>8} {n * routes_per_planet:>9} {scan_t:>10.4f} {heap_t:>10.4f} {scan_t / heap_t:>7.1f}x")
+        else:
+            print(f"{n:>8} {n * routes_per_planet:>9} {'-':>10} {heap_t:>10.4f} {'-':>8}")
+
+
+def run_dynamic(num_planets=20000, routes_per_planet=4, edits=200, seed=0):
+    planets, graph = random_graph(num_planets, num_planets * routes_per_planet, seed=seed)
+    reverse = build_reverse_index(graph)
+    rng = random.Random(seed)
+    src = planets[0]
+    tree = dijkstra(graph, src)
+    repair_t = 0.0
+    full_t = 0.0
+    for _ in range(edits):
+        u = rng.choice(planets)
+        if not graph[u]:
+            continue
+        v, _ = rng.choice(graph[u])
+        fuel = rng.randint(1, 50)
+        t0 = perf_counter()
+        dynamic.update_route(graph, reverse, u, v, fuel, trees=[tree])
+        repair_t += perf_counter() - t0
+        t0 = perf_counter()
+        fresh = dijkstra(graph, src)
+        full_t += perf_counter() - t0
+        assert fresh[0] == tree[0]
+    print(f"{edits} 次燃料修改 (V={num_planets}): 增量修復 {repair_t:.4f}s | 重新計算 {full_t:.4f}s"
+          f" | {full_t / repair_t:.0f}x")
+
+
+# ----------------------------
+# Scaling suite
+# ----------------------------
+
+def measure(fn, repeat):
+    # 回傳每次執行的秒數
+    times = []
+    for _ in range(repeat):
+        t0 = perf_counter()
+        fn()
+        times.append(perf_counter() - t0)
+    return times
+
+
+def peak_memory(fn):
+    # tracemalloc 會拖慢執行，所以和計時分開跑一次
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def suite_cases(n, planets, graph, rng, queries=5):
+    """[(演算法名稱, callable, 上限)]；超過上限的規模會被略過"""
+    pairs = [(rng.choice(planets), rng.choice(planets)) for _ in range(queries)]
+    shuffled = planets[:]
+    rng.shuffle(shuffled)
+    sorted_planets = sorted(planets, key=namesort.natural_key)  # 與 binary_search 的比較鍵一致
+    targets = [rng.choice(planets) for _ in range(queries)]
+    assert all(binary_search(sorted_planets, t) != -1 for t in targets)
+
+    return [
+        ("bfs_path", lambda: [bfs_path(graph, s, g) for s, g in pairs], None),
+        ("dijkstra", lambda: dijkstra(graph, pairs[0][0]), None),
+        ("selection_sort", lambda: selection_sort(shuffled), 5000),
+        ("quicksort", lambda: quicksort(shuffled), None),
+        ("linear_search", lambda: [linear_search(planets, t) for t in targets], None),
+        ("binary_search", lambda: [binary_search(sorted_planets, t) for t in targets], None),
+    ]
+
+
+def run_suite(sizes=(100, 1000, 10000, 100000, 1000000), repeat=5, seed=0,
+              routes_per_planet=4, only=None, log=print):
+    results = []
+    for n in sizes:
+        planets, graph = random_graph(n, n * routes_per_planet, seed=seed + n)
+        rng = random.Random(seed + n)
+        for name, fn, limit in suite_cases(n, planets, graph, rng):
+            if (only and name not in only) or (limit is not None and n > limit):
+                continue
+            times = measure(fn, repeat)
+            row = {"algorithm": name, "n": n, "repeat": repeat,
+                   "min": min(times), "median": statistics.median(times),
+                   "mean": statistics.fmean(times), "peak_bytes": peak_memory(fn)}
+            results.append(row)
+            log(f"{name:>15} n={n:<8} median {row['median']:.6f}s  peak {row['peak_bytes'] / 1024:.0f} KiB")
+    return {"meta": {"generated_at": str(datetime.now()), "python": platform.python_version(),
+                     "platform": platform.platform(), "seed": seed, "repeat": repeat,
+                     "routes_per_planet": routes_per_planet},
+            "results": results}
+
+
+def compare(current, baseline):
+    """
+    依 (algorithm, n) 比對最快一次的時間 (min 比 median 不容易受背景負載影響)，
+    回傳 [(algorithm, n, 目前, baseline, 倍率)]。
+    """
+    base = {(r["algorithm"], r["n"]): r for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        b = base.get((r["algorithm"], r["n"]))
+        if b is None or b["min"] <= 0:
+            continue
+        rows.append((r["algorithm"], r["n"], r["min"], b["min"], r["min"] / b["min"]))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="mission3 效能測試")
+    sub = parser.add_subparsers(dest="command")
+
+    p = sub.add_parser("suite", help="規模測試並輸出 JSON")
+    p.add_argument("--sizes", default="100,1000,10000,100000,1000000",
+                   help="以逗號分隔的星球數")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--only", default="", help="只跑指定演算法，以逗號分隔")
+    p.add_argument("-o", "--output", default="bench_results.json")
+    p.add_argument("--baseline", default=None, help="與先前存下的結果比較")
+    p.add_argument("--threshold", type=float, default=1.25)
+    sub.add_parser("dijkstra", help="線性掃描 vs. 二元堆積 Dijkstra")
+    sub.add_parser("dynamic", help="增量修復 vs. 重新計算")
+    args = parser.parse_args(argv)
+
+    if args.command == "dijkstra":
+        run()
+        return 0
+    if args.command == "dynamic":
+        run_dynamic()
+        return 0
+    if args.command != "suite":
+        parser.print_help()
+        return 0
+
+    sizes = [int(x) for x in args.sizes.split(",") if x]
+    only = set(x for x in args.only.split(",") if x)
+    result = run_suite(sizes, repeat=args.repeat, seed=args.seed, only=only)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"結果已寫入 {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = 0
+        print(f"{'algorithm':>15} {'n':>8} {'now (s)':>10} {'base (s)':>10} {'ratio':>7}")
+        for name, n, now, base, ratio in compare(result, baseline):
+            flag = "  <-- 退步" if ratio > args.threshold else ""
+            regressions += ratio > args.threshold
+            print(f"{name:>15} {n:>8} {now:>10.6f} {base:>10.6f} {ratio:>6.2f}x{flag}")
+        if regressions:
+            print(f"{regressions} 項超過門檻 {args.threshold}x")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,351 @@
+# ch.py
+# 收縮階層 (Contraction Hierarchies)
+#
+# 預處理：依重要性由低到高逐一「收縮」星球 v —— 把 v 從圖中拿掉，
+# 若某條 u -> v -> w 是 u 到 w 的唯一最短路徑，就補一條 u -> w 的捷徑 (shortcut)，
+# 捷徑記錄中間點 v，之後可以展開回原本的航道。
+# 查詢：起點只往「排名較高」的星球走，終點反向也只往高處走，兩邊在頂端相遇。
+# 結果存成 <map>.ch，與 JSON + 變更記錄的雜湊 (changelog.digest) 綁定。
+#
+# 執行方式：python ch.py space_map.json   (建立並儲存 <map>.ch)
+
+import heapq
+import os
+import struct
+import sys
+from array import array
+
+import changelog
+import csr
+import snapshot
+
+MAGIC = b"SPMAPCH_"
+VERSION = 1
+HEADER = struct.Struct("<8sHxxI32s32sII")
+NO_MID = -1
+
+
+def ch_path(filename):
+    return os.path.splitext(filename)[0] + ".ch"
+
+
+# ----------------------------
+# Preprocessing
+# ----------------------------
+
+def _witness(out, source, skip, limit, max_settled):
+    # 不經過 skip 的有限 Dijkstra；只需要知道 limit 以內的距離
+    dist = {source: 0}
+    heap = [(0, source)]
+    settled = 0
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        if d > limit or settled >= max_settled:
+            break
+        settled += 1
+        for v, (w, _) in out[u].items():
+            if v == skip:
+                continue
+            nd = d + w
+            if nd < dist.get(v, float('inf')):
+                dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+    return dist
+
+
+def _shortcuts(out, inn, v, max_settled):
+    # 收縮 v 時需要補上的捷徑 [(u, w, fuel), ...]
+    outs = [(w, c) for w, (c, _) in out[v].items()]
+    if not outs:
+        return []
+    max_out = max(c for _, c in outs)
+    result = []
+    for u, (cu, _) in inn[v].items():
+        dist = _witness(out, u, v, cu + max_out, max_settled)
+        for w, cw in outs:
+            if w != u and dist.get(w, float('inf')) > cu + cw:
+                result.append((u, w, cu + cw))
+    return result
+
+
+def _priority(out, inn, v, deleted, shortcuts):
+    # edge difference + 已收縮鄰居數：先收縮不會產生太多捷徑、且周圍還沒被收縮的星球
+    return len(shortcuts) - len(out[v]) - len(inn[v]) + deleted[v]
+
+
+def preprocess(graph, max_settled=50, max_pairs=400):
+    """
+    graph 可以是 dict-of-lists 或 CSR。
+    max_settled 限制 witness search 的規模：越小預處理越快，但捷徑會變多（結果仍然正確）。
+    收縮到某星球的 (入邊數 x 出邊數) 超過 max_pairs 時停止，剩下的星球成為「核心」：
+    核心內的航道雙向搜尋都可以走，隨機圖這類收縮後會變稠密的地圖靠它控制預處理時間。
+    """
+    g = csr.from_graph(graph)
+    n = csr.num_planets(g)
+    offsets = g["offsets"]
+    targets = g["targets"]
+    weights = g["weights"]
+
+    # out[u][w] = (fuel, mid)；重複航道只保留燃料最少的一條
+    out = [{} for _ in range(n)]
+    inn = [{} for _ in range(n)]
+    for u in range(n):
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets[k]
+            w = weights[k]
+            if v != u and w < out[u].get(v, (float('inf'),))[0]:
+                out[u][v] = (w, NO_MID)
+                inn[v][u] = (w, NO_MID)
+
+    deleted = [0] * n
+    heap = [(_priority(out, inn, v, deleted, _shortcuts(out, inn, v, max_settled)), v)
+            for v in range(n)]
+    heapq.heapify(heap)
+    rank = array('i', [-1]) * n
+    up_out = [None] * n  # v -> 較高排名星球的航道
+    up_in = [None] * n   # 較高排名星球 -> v 的航道
+    order = 0
+
+    while heap:
+        _, v = heapq.heappop(heap)
+        if rank[v] != -1:
+            continue
+        if len(inn[v]) * len(out[v]) > max_pairs:
+            heapq.heappush(heap, (0, v))
+            break
+        # lazy update：重新計算優先度，若已不是最小就放回去
+        shortcuts = _shortcuts(out, inn, v, max_settled)
+        p = _priority(out, inn, v, deleted, shortcuts)
+        if heap and p > heap[0][0]:
+            heapq.heappush(heap, (p, v))
+            continue
+
+        for u, w, c in shortcuts:
+            if c < out[u].get(w, (float('inf'),))[0]:
+                out[u][w] = (c, v)
+                inn[w][u] = (c, v)
+
+        rank[v] = order
+        order += 1
+        up_out[v] = [(w, c, m) for w, (c, m) in out[v].items()]
+        up_in[v] = [(u, c, m) for u, (c, m) in inn[v].items()]
+        for w in out[v]:
+            del inn[w][v]
+            deleted[w] += 1
+        for u in inn[v]:
+            del out[u][v]
+            deleted[u] += 1
+        out[v] = inn[v] = None
+
+    # 核心：剩下的星球排在最高位，彼此之間的航道全部保留
+    for v in range(n):
+        if rank[v] == -1:
+            rank[v] = order
+            order += 1
+            up_out[v] = [(w, c, m) for w, (c, m) in out[v].items()]
+            up_in[v] = [(u, c, m) for u, (c, m) in inn[v].items()]
+
+    fwd = _pack_edges(up_out)
+    bwd = _pack_edges(up_in)
+    return {"kind": "ch", "names": g["names"], "index": g["index"], "rank": rank,
+            "fwd": fwd, "bwd": bwd}
+
+
+def _pack_edges(adj):
+    offsets = array('i', [0])
+    targets = array('i')
+    weights = array('i')
+    mids = array('i')
+    for edges in adj:
+        for v, c, m in edges:
+            targets.append(v)
+            weights.append(c)
+            mids.append(m)
+        offsets.append(len(targets))
+    return {"offsets": offsets, "targets": targets, "weights": weights, "mids": mids}
+
+
+# ----------------------------
+# Persistence
+# ----------------------------
+
+_ARRAYS = ("offsets", "targets", "weights", "mids")
+
+
+def save(index, filename):
+    path = ch_path(filename)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(index["names"]), changelog.digest(filename),
+                            snapshot.names_digest(index["names"]),
+                            len(index["fwd"]["targets"]), len(index["bwd"]["targets"])))
+        index["rank"].tofile(f)
+        for side in ("fwd", "bwd"):
+            for key in _ARRAYS:
+                index[side][key].tofile(f)
+    os.replace(tmp, path)
+    return path
+
+
+def load(filename, graph):
+    """<map>.ch 存在且與目前地圖相符時回傳索引，否則回傳 None"""
+    path = ch_path(filename)
+    if not os.path.exists(path) or not os.path.exists(filename):
+        return None
+    names = graph["names"] if csr.is_csr(graph) else csr.from_graph(graph)["names"]
+    n = len(names)
+    with open(path, "rb") as f:
+        head = f.read(HEADER.size)
+        if len(head) < HEADER.size:
+            return None
+        magic, version, num, digest, order_digest, m_fwd, m_bwd = HEADER.unpack(head)
+        if magic != MAGIC or version != VERSION or num != n:
+            return None
+        if digest != changelog.digest(filename) or order_digest != snapshot.names_digest(names):
+            return None
+        try:
+            rank = array('i')
+            rank.fromfile(f, n)
+            sides = {}
+            for side, m in (("fwd", m_fwd), ("bwd", m_bwd)):
+                sides[side] = {}
+                for key in _ARRAYS:
+                    arr = array('i')
+                    arr.fromfile(f, n + 1 if key == "offsets" else m)
+                    sides[side][key] = arr
+        except EOFError:
+            return None
+    return {"kind": "ch", "names": names, "index": {p: i for i, p in enumerate(names)},
+            "rank": rank, "fwd": sides["fwd"], "bwd": sides["bwd"]}
+
+
+def load_or_build(filename, graph):
+    index = load(filename, graph)
+    if index is None:
+        index = preprocess(graph)
+        try:
+            save(index, filename)
+        except OSError as e:
+            print("無法寫入 CH 索引：", e)
+    return index
+
+
+# ----------------------------
+# Query
+# ----------------------------
+
+def _find_mid(side, u, v):
+    # 在 u 的邊中找出連到 v 的那條，回傳其中間點
+    for k in range(side["offsets"][u], side["offsets"][u + 1]):
+        if side["targets"][k] == v:
+            return side["mids"][k]
+    raise KeyError((u, v))
+
+
+def _unpack(index, a, b, mid, path):
+    # 把航道 a -> b 展開成原始航道，依序把 a 之後的星球加到 path
+    stack = [(a, b, mid)]
+    while stack:
+        a, b, m = stack.pop()
+        if m == NO_MID:
+            path.append(b)
+            continue
+        # m 比 a、b 都早被收縮，所以 a -> m 記在 bwd[m]，m -> b 記在 fwd[m]
+        stack.append((m, b, _find_mid(index["fwd"], m, b)))
+        stack.append((a, m, _find_mid(index["bwd"], m, a)))
+
+
+def _stalled(opposite, dist, u, d):
+    # stall-on-demand：若能從某個較高排名的星球更便宜地到達 u，u 不可能在最短路徑上，
+    # 就不必從 u 繼續往外展開
+    offsets = opposite["offsets"]
+    targets = opposite["targets"]
+    weights = opposite["weights"]
+    for k in range(offsets[u], offsets[u + 1]):
+        dx = dist.get(targets[k])
+        if dx is not None and dx + weights[k] < d:
+            return True
+    return False
+
+
+def query(index, start, goal):
+    """回傳 (最低燃料, 路徑)；無法抵達時為 (inf, [])"""
+    names_index = index["index"]
+    if start not in names_index or goal not in names_index:
+        return float('inf'), []
+    s = names_index[start]
+    t = names_index[goal]
+    names = index["names"]
+    if s == t:
+        return 0, [start]
+
+    dist = ({s: 0}, {t: 0})
+    parent = ({s: None}, {t: None})  # v -> (前一個星球, 中間點)
+    heaps = ([(0, s)], [(0, t)])
+    sides = (index["fwd"], index["bwd"])
+    best = float('inf')
+    meet = -1
+
+    while True:
+        progressed = False
+        for i in (0, 1):
+            heap = heaps[i]
+            if not heap or heap[0][0] >= best:
+                continue
+            progressed = True
+            d, u = heapq.heappop(heap)
+            if d > dist[i][u]:
+                continue
+            other = dist[1 - i]
+            if u in other and d + other[u] < best:
+                best = d + other[u]
+                meet = u
+            if _stalled(sides[1 - i], dist[i], u, d):
+                continue
+            side = sides[i]
+            offsets = side["offsets"]
+            targets = side["targets"]
+            weights = side["weights"]
+            mids = side["mids"]
+            for k in range(offsets[u], offsets[u + 1]):
+                v = targets[k]
+                nd = d + weights[k]
+                if nd < dist[i].get(v, float('inf')):
+                    dist[i][v] = nd
+                    parent[i][v] = (u, mids[k])
+                    heapq.heappush(heap, (nd, v))
+        if not progressed:
+            break
+
+    if meet == -1:
+        return float('inf'), []
+
+    # 前半段：s -> meet
+    chain = []
+    v = meet
+    while parent[0][v] is not None:
+        u, m = parent[0][v]
+        chain.append((u, v, m))
+        v = u
+    path = [s]
+    for u, v, m in reversed(chain):
+        _unpack(index, u, v, m, path)
+    # 後半段：meet -> t（bwd 的邊方向與原航道相反）
+    v = meet
+    while parent[1][v] is not None:
+        u, m = parent[1][v]
+        _unpack(index, v, u, m, path)
+        v = u
+    return best, [names[i] for i in path]
+
+
+if __name__ == '__main__':
+    import main
+    filename = sys.argv[1] if len(sys.argv) > 1 else "space_map.json"
+    _, graph = main.load_space_map(filename, backend="csr")
+    if graph is not None:
+        index = preprocess(graph)
+        print(f"CH 索引已寫入 {save(index, filename)}"
+              f" (捷徑後共 {len(index['fwd']['targets']) + len(index['bwd']['targets'])} 條邊)")
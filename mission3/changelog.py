@@ -0,0 +1,302 @@
+# changelog.py
+# 航道編輯的 append-only 變更記錄 <map>.log：每次編輯只在檔尾追加一行，不必重寫整份 space_map.json
+#
+# 檔案格式 (JSON Lines)：
+#   第一行   {"changelog": 1, "base": <JSON 的 content_hash>, "base_size": <bytes>}
+#   其後     {"op": "add" | "update", "from", "to", "fuel"} / {"op": "remove", "from", "to"} / {"op": "planet", "name"}
+# 載入地圖時把記錄依序套用到 streamjson 的事件上 (fold)，dict 與 CSR 兩種格式都適用。
+# header 的 base 與目前 JSON 不符 (JSON 被重新產生或手動修改) 時，記錄不再適用，改名為 <map>.log.stale。
+# 最後一行不完整 (寫到一半當機) 時忽略該行。
+#
+# 壓縮 (compact)：把 JSON + 記錄合併成新的 JSON，在背景執行緒進行，期間的編輯照常追加：
+#   1. 記下目前的記錄數 N，把 JSON + 前 N 筆寫成 <map>.json.tmp
+#   2. (持鎖) 把第 N 筆之後的記錄寫成新的 <map>.log.tmp，header 指向新的 JSON
+#   3. (持鎖) 依序 os.replace JSON 與 log；兩步之間當機時，下次開啟會採用 header 相符的 <map>.log.tmp
+#
+# digest() 是 JSON + 記錄的雜湊，snapshot / CH / ALT 以它判斷索引是否對應目前的地圖。
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+import snapshot
+import streamjson
+
+VERSION = 1
+COMPACT_MIN_BYTES = 1 << 20     # 記錄超過 max(COMPACT_MIN_BYTES, COMPACT_RATIO * JSON 大小) 時建議壓縮
+COMPACT_RATIO = 0.25
+
+_hashes = {}                    # 路徑 -> (大小, mtime_ns, content_hash)，避免同一份 JSON 重複雜湊
+
+
+def log_path(filename):
+    return os.path.splitext(filename)[0] + ".log"
+
+
+def _base_hash(filename):
+    st = os.stat(filename)
+    key = os.path.abspath(filename)
+    cached = _hashes.get(key)
+    if cached is not None and cached[:2] == (st.st_size, st.st_mtime_ns):
+        return cached[2]
+    digest = snapshot.content_hash(filename)
+    _hashes[key] = (st.st_size, st.st_mtime_ns, digest)
+    return digest
+
+
+def _header(filename):
+    return json.dumps({"changelog": VERSION, "base": _base_hash(filename).hex(),
+                       "base_size": os.path.getsize(filename)}) + "\n"
+
+
+def _matches(path, filename):
+    # path 的 header 是否指向目前的 JSON
+    try:
+        with open(path, "rb") as f:
+            head = json.loads(f.readline())
+    except (OSError, ValueError):
+        return False
+    return (isinstance(head, dict) and head.get("changelog") == VERSION
+            and head.get("base") == _base_hash(filename).hex())
+
+
+def _lines(filename):
+    """
+    回傳適用於目前 JSON 的記錄原始行 (bytes，不含 header 與不完整的最後一行)；
+    沒有 log 時回傳 []，log 屬於其他版本的 JSON 時回傳 None。
+    """
+    path = log_path(filename)
+    if not os.path.exists(path):
+        return []
+    if not _matches(path, filename):
+        # 壓縮時在 JSON 換好、log 還沒換好之間中斷：採用已寫好的新 log
+        tmp = path + ".tmp"
+        if os.path.exists(tmp) and _matches(tmp, filename):
+            os.replace(tmp, path)
+        else:
+            return None
+    with open(path, "rb") as f:
+        f.readline()
+        lines = f.read().split(b"\n")
+    # 最後一個元素是換行之後的部分：完整結尾時為空字串，否則是寫到一半的一行
+    return [line for line in lines[:-1] if line.strip()]
+
+
+def read(filename):
+    """適用於目前 JSON 的記錄 list (見檔頭格式)；沒有或已過期時為 []"""
+    lines = _lines(filename)
+    return [json.loads(line) for line in lines] if lines else []
+
+
+def digest(filename):
+    """
+    JSON + 變更記錄的雜湊。沒有記錄時就是 JSON 的 content_hash，
+    所以沒用過變更記錄的地圖，既有的快照與索引仍然有效。
+    """
+    base = _base_hash(filename)
+    lines = _lines(filename)
+    if not lines:
+        return base
+    h = hashlib.blake2b(base, digest_size=32)
+    for line in lines:
+        h.update(line)
+        h.update(b"\n")
+    return h.digest()
+
+
+# ----------------------------
+# Replay
+# ----------------------------
+
+def fold(events, records):
+    """
+    把 records 套用到 streamjson 的事件流上，產生編輯後的事件流。
+    沒被記錄動到的航道照原順序直接交出；被動到的 (from, to) 先暫存，最後依記錄重演後再交出。
+    語意與 dynamic.py 相同：add 附加一條、remove / update 作用在第一條。
+    """
+    touched = {}
+    planets = []
+    for rec in records:
+        if rec["op"] == "planet":
+            planets.append(rec["name"])
+        else:
+            touched[(rec["from"], rec["to"])] = []
+    if not touched and not planets:
+        yield from events
+        return
+
+    for kind, item in events:
+        if kind == "route" and (item[0], item[1]) in touched:
+            touched[(item[0], item[1])].append(item[2])
+        else:
+            yield kind, item
+    for name in planets:
+        yield "planet", name
+    for rec in records:
+        op = rec["op"]
+        if op == "planet":
+            continue
+        fuels = touched[(rec["from"], rec["to"])]
+        if op == "add":
+            fuels.append(rec["fuel"])
+        elif op == "remove":
+            del fuels[0]
+        elif op == "update":
+            fuels[0] = rec["fuel"]
+        else:
+            raise ValueError(f"未知的變更記錄：{op}")
+    for (frm, to), fuels in touched.items():
+        for fuel in fuels:
+            yield "route", (frm, to, fuel)
+
+
+# ----------------------------
+# Append
+# ----------------------------
+
+def open_log(filename):
+    """
+    開啟 filename 的變更記錄以便追加，回傳狀態 dict。
+    log 屬於舊版 JSON 時改名為 <map>.log.stale，重新開始一份。
+    還沒有 log 時不建立檔案，等第一次 append 才寫出 header。
+    """
+    path = log_path(filename)
+    lines = _lines(filename)
+    if lines is None:
+        os.replace(path, path + ".stale")
+        print(f"{path} 與目前的地圖不符，已改名為 {path}.stale")
+        lines = []
+    log = {"map": filename, "path": path, "file": None, "records": [json.loads(line) for line in lines],
+           "bytes": 0, "lock": threading.Lock(), "thread": None}
+    if os.path.exists(path):
+        _open_file(log)
+    return log
+
+
+def _open_file(log):
+    path = log["path"]
+    if not os.path.exists(path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(_header(log["map"]))
+    f = open(path, "ab")
+    if f.tell() and not _ends_with_newline(path):
+        f.write(b"\n")  # 上次寫到一半的一行，補上換行讓它自成一行 (讀取時會被略過)
+    log["file"] = f
+    log["bytes"] = f.tell()
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def append(log, rec):
+    """追加一筆記錄並 fsync：每次編輯只寫一行，O(1) 的磁碟 I/O"""
+    line = json.dumps(rec, ensure_ascii=False).encode("utf-8") + b"\n"
+    with log["lock"]:
+        if log["file"] is None:
+            _open_file(log)
+        f = log["file"]
+        f.write(line)
+        f.flush()
+        os.fsync(f.fileno())
+        log["records"].append(rec)
+        log["bytes"] += len(line)
+
+
+def close(log):
+    wait(log)
+    if log["file"] is not None:
+        log["file"].close()
+
+
+def should_compact(log):
+    base_size = os.path.getsize(log["map"])
+    return log["bytes"] >= max(COMPACT_MIN_BYTES, COMPACT_RATIO * base_size)
+
+
+# ----------------------------
+# Compaction
+# ----------------------------
+
+def _write_map(out, filename, records, h, meta):
+    # 與 generate_random_space_data 相同的排版；先掃一次取得星球清單，第二次逐筆寫出航道，
+    # 同時計算寫出內容的 content_hash
+    def emit(text):
+        data = text.encode("utf-8")
+        out.write(data)
+        h.update(data)
+
+    planets = [item for kind, item in fold(streamjson.iter_space_map(filename), records) if kind == "planet"]
+    emit('{\n  "planets": [\n')
+    emit(",\n".join("    " + json.dumps(p, ensure_ascii=False) for p in planets))
+    emit('\n  ],\n  "routes": [\n')
+    routes = 0
+    for kind, item in fold(streamjson.iter_space_map(filename), records):
+        if kind == "route":
+            frm, to, fuel = item
+            emit((",\n" if routes else "") + "    "
+                 + json.dumps({"from": frm, "to": to, "fuel": fuel}, ensure_ascii=False))
+            routes += 1
+    emit(f'\n  ],\n  "meta": {json.dumps(meta)}\n}}\n')
+    return len(planets), routes
+
+
+def compact(log, echo=print):
+    """
+    把 JSON + 目前的變更記錄合併成新的 JSON，log 只留下壓縮期間新增的記錄。
+    回傳併入的記錄數。
+    """
+    filename = log["map"]
+    with log["lock"]:
+        records = list(log["records"])
+    if not records:
+        return 0
+
+    tmp = filename + ".tmp"
+    h = hashlib.blake2b(digest_size=32)
+    meta = {"compacted_at": str(datetime.now()), "changes": len(records)}
+    with open(tmp, "wb") as out:
+        n_planets, n_routes = _write_map(out, filename, records, h, meta)
+        out.flush()
+        os.fsync(out.fileno())
+
+    with log["lock"]:
+        rest = log["records"][len(records):]
+        size = os.path.getsize(tmp)
+        header = json.dumps({"changelog": VERSION, "base": h.hexdigest(), "base_size": size}) + "\n"
+        body = "".join(json.dumps(rec, ensure_ascii=False) + "\n" for rec in rest)
+        log_tmp = log["path"] + ".tmp"
+        with open(log_tmp, "w", encoding="utf-8") as f:
+            f.write(header + body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, filename)
+        os.replace(log_tmp, log["path"])
+        st = os.stat(filename)
+        _hashes[os.path.abspath(filename)] = (st.st_size, st.st_mtime_ns, h.digest())
+        log["file"].close()
+        log["file"] = open(log["path"], "ab")
+        log["records"] = rest
+        log["bytes"] = log["file"].tell()
+    echo(f"變更記錄已併入 {filename}：{len(records)} 筆 ({n_planets} planets, {n_routes} routes)")
+    return len(records)
+
+
+def compact_async(log, echo=print):
+    """在背景執行緒壓縮；已經有壓縮在進行時不重複啟動。回傳執行緒 (或 None)"""
+    if log["thread"] is not None and log["thread"].is_alive():
+        return None
+    log["thread"] = threading.Thread(target=compact, args=(log, echo), name="changelog-compact")
+    log["thread"].start()
+    return log["thread"]
+
+
+def wait(log):
+    # 等待進行中的背景壓縮結束 (重新載入地圖或結束程式之前)
+    thread = log["thread"]
+    if thread is not None:
+        thread.join()
@@ -0,0 +1,367 @@
+# csr.py
+# 壓縮稀疏列 (Compressed Sparse Row) 圖形
+#
+# 星球名稱轉成整數 ID，航道存在三個 array('i')：
+#   offsets[u] ~ offsets[u+1]  為 u 的出邊範圍
+#   targets[k]                 第 k 條航道的終點 ID
+#   weights[k]                 第 k 條航道的燃料
+# 每條航道只佔 8 bytes，dict-of-lists 版本則要 150+ bytes。
+
+import heapq
+from array import array
+from collections import deque
+
+
+def is_csr(graph):
+    return isinstance(graph, dict) and graph.get("kind") == "csr"
+
+
+# ----------------------------
+# Build
+# ----------------------------
+
+def new_builder():
+    # 逐筆累積航道的暫存結構，finish() 時才排成 CSR
+    return {"names": [], "index": {},
+            "src": array('i'), "dst": array('i'), "fuel": array('i')}
+
+
+def add_planet(builder, name):
+    index = builder["index"]
+    if name not in index:
+        index[name] = len(builder["names"])
+        builder["names"].append(name)
+    return index[name]
+
+
+def add_route(builder, frm, to, fuel):
+    builder["src"].append(add_planet(builder, frm))
+    builder["dst"].append(add_planet(builder, to))
+    builder["fuel"].append(fuel)
+
+
+def finish(builder):
+    return _pack(builder["names"], builder["index"],
+                 builder["src"], builder["dst"], builder["fuel"])
+
+
+def build_csr(planets, routes):
+    """
+    planets: 星球名稱 list
+    routes: (from, to, fuel) 的 iterable，可以是 generator，逐筆讀入不會整批留在記憶體
+    """
+    builder = new_builder()
+    for p in planets:
+        add_planet(builder, p)
+    for frm, to, w in routes:
+        add_route(builder, frm, to, w)
+    return finish(builder)
+
+
+def from_graph(graph):
+    """把 load_space_map 的 dict-of-lists 圖轉成 CSR"""
+    if is_csr(graph):
+        return graph
+    routes = ((u, v, w) for u in graph for v, w in graph[u])
+    return build_csr(list(graph), routes)
+
+
+def reverse(csr):
+    """轉置：回傳所有航道反向後的 CSR，names / index 與原圖共用"""
+    offsets = csr["offsets"]
+    src = array('i', bytes(4 * len(csr["targets"])))
+    for u in range(len(csr["names"])):
+        for k in range(offsets[u], offsets[u + 1]):
+            src[k] = u
+    return _pack(csr["names"], csr["index"], csr["targets"], src, csr["weights"])
+
+
+def _pack(names, index, src, dst, fuel):
+    # counting sort：依起點把 (src, dst, fuel) 排成連續區段
+    n = len(names)
+    m = len(src)
+    offsets = array('i', bytes(4 * (n + 1)))
+    for s in src:
+        offsets[s + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+
+    targets = array('i', bytes(4 * m))
+    weights = array('i', bytes(4 * m))
+    pos = offsets[:-1]
+    for k in range(m):
+        s = src[k]
+        p = pos[s]
+        targets[p] = dst[k]
+        weights[p] = fuel[k]
+        pos[s] = p + 1
+
+    return {"kind": "csr", "names": names, "index": index,
+            "offsets": offsets, "targets": targets, "weights": weights}
+
+
+# ----------------------------
+# Access
+# ----------------------------
+
+def num_planets(csr):
+    return len(csr["names"])
+
+
+def num_routes(csr):
+    return len(csr["targets"])
+
+
+def has_planet(csr, name):
+    return name in csr["index"]
+
+
+def iter_routes(csr):
+    names = csr["names"]
+    offsets = csr["offsets"]
+    targets = csr["targets"]
+    weights = csr["weights"]
+    for u in range(len(names)):
+        for k in range(offsets[u], offsets[u + 1]):
+            yield names[u], names[targets[k]], weights[k]
+
+
+def routes_from(csr, name):
+    # 與 dict-of-lists 的 graph[name] 相同格式：[(to, fuel), ...]
+    u = csr["index"][name]
+    names = csr["names"]
+    targets = csr["targets"]
+    weights = csr["weights"]
+    return [(names[targets[k]], weights[k]) for k in range(csr["offsets"][u], csr["offsets"][u + 1])]
+
+
+def _path(parent, names, goal_id):
+    path = []
+    cur = goal_id
+    while cur != -1:
+        path.append(names[cur])
+        cur = parent[cur]
+    path.reverse()
+    return path
+
+
+# ----------------------------
+# BFS / Dijkstra on CSR
+# ----------------------------
+
+def bfs_path(csr, start, goal, reverse=None, stats=None):
+    # stats 為 dict 時寫入 settled / relaxed / pushes / max_queue (見 probe.py)
+    index = csr["index"]
+    if start not in index or goal not in index:
+        return []
+    s = index[start]
+    t = index[goal]
+    if reverse is not None:
+        return _bidirectional_bfs(csr, reverse, s, t, stats)
+    offsets = csr["offsets"]
+    targets = csr["targets"]
+    parent = array('i', [-1]) * len(csr["names"])
+    seen = bytearray(len(csr["names"]))
+    seen[s] = 1
+    queue = deque([s])
+
+    if stats is None:
+        # 量測關閉時走沒有計數的迴圈
+        while queue:
+            u = queue.popleft()
+            if u == t:
+                break
+            for k in range(offsets[u], offsets[u + 1]):
+                v = targets[k]
+                if not seen[v]:
+                    seen[v] = 1
+                    parent[v] = u
+                    queue.append(v)
+    else:
+        settled = relaxed = peak = 0
+        while queue:
+            if len(queue) > peak:
+                peak = len(queue)
+            u = queue.popleft()
+            settled += 1
+            if u == t:
+                break
+            relaxed += offsets[u + 1] - offsets[u]
+            for k in range(offsets[u], offsets[u + 1]):
+                v = targets[k]
+                if not seen[v]:
+                    seen[v] = 1
+                    parent[v] = u
+                    queue.append(v)
+        stats.update(settled=settled, relaxed=relaxed,
+                     pushes=settled + len(queue), max_queue=peak)
+
+    if not seen[t]:
+        return []
+    return _path(parent, csr["names"], t)
+
+
+def bfs_tree(csr, start):
+    # 從 start 出發的完整 BFS 樹，回傳 {星球: 上一站}（只含抵達得了的星球）
+    index = csr["index"]
+    if start not in index:
+        return {}
+    s = index[start]
+    offsets = csr["offsets"]
+    targets = csr["targets"]
+    parent = array('i', [-1]) * len(csr["names"])
+    seen = bytearray(len(csr["names"]))
+    seen[s] = 1
+    queue = deque([s])
+    while queue:
+        u = queue.popleft()
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets[k]
+            if not seen[v]:
+                seen[v] = 1
+                parent[v] = u
+                queue.append(v)
+    names = csr["names"]
+    return {names[v]: (names[parent[v]] if parent[v] != -1 else None)
+            for v in range(len(names)) if seen[v]}
+
+
+def _expand_level(csr, frontier, dist, link, other_dist):
+    offsets = csr["offsets"]
+    targets = csr["targets"]
+    nxt = []
+    meet = -1
+    best = -1
+    for u in frontier:
+        du = dist[u] + 1
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets[k]
+            if dist[v] == -1:
+                dist[v] = du
+                link[v] = u
+                nxt.append(v)
+                if other_dist[v] != -1 and (best == -1 or du + other_dist[v] < best):
+                    best = du + other_dist[v]
+                    meet = v
+    return nxt, meet
+
+
+def _bidirectional_bfs(csr, reverse, s, t, stats=None):
+    names = csr["names"]
+    if s == t:
+        return [names[s]]
+    n = len(names)
+    dist_f = array('i', [-1]) * n
+    dist_b = array('i', [-1]) * n
+    parent = array('i', [-1]) * n
+    child = array('i', [-1]) * n
+    dist_f[s] = 0
+    dist_b[t] = 0
+    front_f, front_b = [s], [t]
+    meet = -1
+    settled = relaxed = peak = 0
+    pushes = 2
+
+    while front_f and front_b and meet == -1:
+        forward = len(front_f) <= len(front_b)
+        settled += len(front_f) if forward else len(front_b)
+        peak = max(peak, len(front_f) + len(front_b))
+        if stats is not None:
+            offsets = (csr if forward else reverse)["offsets"]
+            relaxed += sum(offsets[u + 1] - offsets[u] for u in (front_f if forward else front_b))
+        if forward:
+            front_f, meet = _expand_level(csr, front_f, dist_f, parent, dist_b)
+            pushes += len(front_f)
+        else:
+            front_b, meet = _expand_level(reverse, front_b, dist_b, child, dist_f)
+            pushes += len(front_b)
+
+    if stats is not None:
+        stats.update(settled=settled, relaxed=relaxed, pushes=pushes, max_queue=peak)
+
+    if meet == -1:
+        return []
+    path = _path(parent, names, meet)
+    cur = child[meet]
+    while cur != -1:
+        path.append(names[cur])
+        cur = child[cur]
+    return path
+
+
+def dijkstra_ids(csr, s, t=-1, stats=None, skip=()):
+    """
+    以整數 ID 執行 Dijkstra，回傳 (dist list, parent array)；未抵達為 inf / -1。
+    stats 為 dict 時寫入 settled / relaxed / pushes / max_queue (見 probe.py)。
+    skip 中的 ID 不會被走到 (與 main.dijkstra 相同，先把距離設成 -1)。
+    """
+    n = len(csr["names"])
+    offsets = csr["offsets"]
+    targets = csr["targets"]
+    weights = csr["weights"]
+    inf = float('inf')
+    dist = [inf] * n
+    parent = array('i', [-1]) * n
+    for v in skip:
+        dist[v] = -1
+    dist[s] = 0
+    heap = [(0, s)]
+
+    if stats is None:
+        # 量測關閉時走沒有計數的迴圈
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            if u == t:
+                break
+            for k in range(offsets[u], offsets[u + 1]):
+                v = targets[k]
+                alt = d + weights[k]
+                if alt < dist[v]:
+                    dist[v] = alt
+                    parent[v] = u
+                    heapq.heappush(heap, (alt, v))
+    else:
+        settled = relaxed = stale = peak = 0
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                stale += 1
+                continue
+            settled += 1
+            if u == t:
+                break
+            relaxed += offsets[u + 1] - offsets[u]
+            for k in range(offsets[u], offsets[u + 1]):
+                v = targets[k]
+                alt = d + weights[k]
+                if alt < dist[v]:
+                    dist[v] = alt
+                    parent[v] = u
+                    heapq.heappush(heap, (alt, v))
+            if len(heap) > peak:
+                peak = len(heap)
+        stats.update(settled=settled, relaxed=relaxed, pushes=settled + stale + len(heap),
+                     max_queue=max(peak, 1))
+    for v in skip:
+        dist[v] = inf
+    return dist, parent
+
+
+def dijkstra(csr, start, goal=None, stats=None, skip=()):
+    # 與 main.dijkstra 相同的 (dist, prev) 介面，但只包含抵達過的星球
+    index = csr["index"]
+    if start not in index:
+        return {}, {}
+    t = index.get(goal, -1) if goal is not None else -1
+    dist_ids, parent = dijkstra_ids(csr, index[start], t, stats, skip)
+    names = csr["names"]
+    inf = float('inf')
+    dist = {}
+    prev = {}
+    for i, d in enumerate(dist_ids):
+        if d != inf:
+            dist[names[i]] = d
+            prev[names[i]] = names[parent[i]] if parent[i] != -1 else None
+    return dist, prev
@@ -0,0 +1,203 @@
+# dotwriter.py
+# 不依賴 graphviz 套件的 DOT 輸出：邊選邊寫，不在記憶體裡建整張 Digraph
+#
+# 大地圖只畫其中一部分，星球數與航道數都有上限：
+#   k_hop          某星球周圍 k 跳內的星球
+#   path           最短路徑 (路徑上的航道標成紅色)，可再加上路徑周圍 k 跳
+#   sample_degree  出入度最高的 N 個星球
+#   sample_weight  依燃料加權抽樣航道，燃料越低越容易被選中
+#
+# 有 graphviz 套件或 dot 執行檔時順便轉成圖檔，兩者都沒有時只留下 DOT 檔。
+
+import heapq
+import json
+import os
+import random
+import shutil
+import subprocess
+from collections import deque
+
+import csr
+
+DEFAULT_MAX_NODES = 500
+DEFAULT_MAX_EDGES = 3000
+
+_KEYWORDS = {"node", "edge", "graph", "digraph", "subgraph", "strict"}
+
+
+# ----------------------------
+# Graph access (dict-of-lists 或 CSR)
+# ----------------------------
+
+def _planets(graph):
+    return graph["names"] if csr.is_csr(graph) else list(graph)
+
+
+def _routes(graph, u):
+    if csr.is_csr(graph):
+        return csr.routes_from(graph, u)
+    return graph.get(u, [])
+
+
+def _all_routes(graph):
+    if csr.is_csr(graph):
+        return csr.iter_routes(graph)
+    return ((u, v, w) for u in graph for v, w in graph[u])
+
+
+# ----------------------------
+# Subgraph selection
+# ----------------------------
+
+def k_hop(graph, centers, k, reverse=None, max_nodes=DEFAULT_MAX_NODES):
+    """
+    從 centers 往外 k 跳內的星球 (依 BFS 順序，最多 max_nodes 個)。
+    有提供 reverse 時也沿著入邊擴展。
+    """
+    seen = {c: 0 for c in centers}
+    queue = deque(centers)
+    while queue and len(seen) < max_nodes:
+        u = queue.popleft()
+        if seen[u] >= k:
+            continue
+        nbrs = [v for v, _ in _routes(graph, u)]
+        if reverse is not None:
+            nbrs += [v for v, _ in _routes(reverse, u)]
+        for v in nbrs:
+            if v not in seen:
+                seen[v] = seen[u] + 1
+                queue.append(v)
+                if len(seen) >= max_nodes:
+                    break
+    return list(seen)
+
+
+def sample_degree(graph, max_nodes=DEFAULT_MAX_NODES):
+    # 掃一次所有航道計算出入度，取度數最高的 max_nodes 個星球
+    degree = dict.fromkeys(_planets(graph), 0)
+    for u, v, _ in _all_routes(graph):
+        degree[u] += 1
+        degree[v] += 1
+    return heapq.nlargest(max_nodes, degree, key=degree.get)
+
+
+def sample_weight(graph, max_nodes=DEFAULT_MAX_NODES, max_edges=DEFAULT_MAX_EDGES, seed=0):
+    """
+    加權蓄水池抽樣 (A-Res)：每條航道的 key 為 random() ** fuel，取 key 最大的 max_edges 條，
+    燃料越低越容易被選中。只掃一次航道，記憶體 O(max_edges)。
+    之後依 key 由大到小收下航道，端點總數不超過 max_nodes。回傳 (星球, 航道)。
+    """
+    rng = random.Random(seed)
+    heap = []
+    for i, (u, v, w) in enumerate(_all_routes(graph)):
+        key = rng.random() ** max(w, 1)
+        if len(heap) < max_edges:
+            heapq.heappush(heap, (key, i, u, v, w))
+        elif key > heap[0][0]:
+            heapq.heapreplace(heap, (key, i, u, v, w))
+    nodes = {}
+    kept = []
+    for _, i, u, v, w in sorted(heap, reverse=True):
+        new = (u not in nodes) + (v not in nodes and v != u)
+        if len(nodes) + new > max_nodes:
+            continue
+        nodes.setdefault(u)
+        nodes.setdefault(v)
+        kept.append((i, u, v, w))
+    kept.sort()
+    return list(nodes), [(u, v, w) for _, u, v, w in kept]
+
+
+def induced_routes(graph, nodes, max_edges=DEFAULT_MAX_EDGES, first=()):
+    # nodes 之間的航道，最多 max_edges 條；first 中的航道 (u, v) 一定先輸出
+    chosen = set(nodes)
+    skip = set(first)
+    count = 0
+    for u, v in first:
+        for x, w in _routes(graph, u):
+            if x == v:
+                yield u, v, w
+                count += 1
+                break
+    for u in nodes:
+        for v, w in _routes(graph, u):
+            if v in chosen and (u, v) not in skip:
+                if count >= max_edges:
+                    return
+                yield u, v, w
+                count += 1
+
+
+def select(graph, center=None, hops=2, path=None, sample=None, reverse=None,
+           max_nodes=DEFAULT_MAX_NODES, max_edges=DEFAULT_MAX_EDGES, seed=0):
+    """
+    回傳 (星球清單, 航道 iterable, 醒目標示的航道集合)。
+    都沒指定且地圖超過 max_nodes 個星球時，自動改用 sample="degree"。
+    """
+    highlight = set()
+    if path:
+        highlight = set(zip(path, path[1:]))
+        nodes = k_hop(graph, path, hops, reverse, max(max_nodes, len(path))) if hops else list(path)
+    elif center is not None:
+        nodes = k_hop(graph, [center], hops, reverse, max_nodes)
+    elif sample == "weight":
+        nodes, routes = sample_weight(graph, max_nodes, max_edges, seed)
+        return nodes, routes, highlight
+    elif sample == "degree" or len(_planets(graph)) > max_nodes:
+        nodes = sample_degree(graph, max_nodes)
+    else:
+        nodes = _planets(graph)
+    first = list(zip(path, path[1:])) if path else ()
+    return nodes, induced_routes(graph, nodes, max_edges, first=first), highlight
+
+
+# ----------------------------
+# Writer
+# ----------------------------
+
+def _quote(name):
+    # 只含英數與底線、且不是 DOT 關鍵字的名稱可以不加引號 (與 graphviz 套件的輸出相同)
+    if name.isascii() and name.isidentifier() and name.lower() not in _KEYWORDS:
+        return name
+    return json.dumps(name, ensure_ascii=False)
+
+
+def write_dot(out, nodes, routes, highlight=(), title="Space Map"):
+    """逐行寫出 DOT；回傳 (星球數, 航道數)"""
+    out.write(f"// {title}\ndigraph {{\n\tnode [shape=circle]\n")
+    marked = {x for edge in highlight for x in edge}
+    n_nodes = 0
+    for node in nodes:
+        q = _quote(node)
+        extra = " color=red penwidth=2" if node in marked else ""
+        out.write(f"\t{q} [label={q}{extra}]\n")
+        n_nodes += 1
+    n_routes = 0
+    for u, v, w in routes:
+        extra = " color=red penwidth=2" if (u, v) in highlight else ""
+        out.write(f"\t{_quote(u)} -> {_quote(v)} [label={w}{extra}]\n")
+        n_routes += 1
+    out.write("}\n")
+    return n_nodes, n_routes
+
+
+def render(source, fmt="pdf", engine="dot"):
+    """
+    把 DOT 檔轉成 <source>.<fmt>：優先用 graphviz 套件，其次用 PATH 上的 engine 執行檔。
+    兩者都沒有時回傳 None。
+    """
+    try:
+        import graphviz
+    except ImportError:
+        graphviz = None
+    if graphviz is not None:
+        try:
+            return graphviz.render(engine, fmt, source)
+        except graphviz.ExecutableNotFound:
+            return None
+    exe = shutil.which(engine)
+    if exe is None:
+        return None
+    output = f"{source}.{fmt}"
+    subprocess.run([exe, f"-T{fmt}", source, "-o", output], check=True)
+    return output if os.path.exists(output) else None
@@ -0,0 +1,129 @@
+# dynamic.py
+# 航道即時編輯 + 最短路徑樹的增量修復 (Ramalingam–Reps 風格的 dynamic SSSP)
+#
+# 只適用 dict-of-lists 的圖 (CSR 是唯讀的)。每個操作同時更新 graph 與反向索引 reverse，
+# 並就地修復傳入的 (dist, prev) 樹，而不是重新跑一次 Dijkstra：
+#   - 燃料變少 / 新增航道：只從受影響的終點開始往外鬆弛
+#   - 燃料變多 / 刪除航道：若它是樹上的邊，先找出該子樹（只有這些星球的距離可能變大），
+#     用子樹外的入邊重新估算，再只在子樹內跑 Dijkstra
+
+import heapq
+
+INF = float('inf')
+
+
+def _find(graph, frm, to):
+    for i, (v, w) in enumerate(graph.get(frm, [])):
+        if v == to:
+            return i, w
+    return -1, None
+
+
+def _check_planets(graph, frm, to):
+    if frm not in graph:
+        raise ValueError(f"星球不存在：{frm}")
+    if to not in graph:
+        raise ValueError(f"星球不存在：{to}")
+
+
+# ----------------------------
+# Tree repair
+# ----------------------------
+
+def _propagate(graph, dist, prev, heap):
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist.get(u, INF):
+            continue
+        for v, w in graph.get(u, []):
+            alt = d + w
+            if alt < dist.get(v, INF):
+                dist[v] = alt
+                prev[v] = u
+                heapq.heappush(heap, (alt, v))
+
+
+def _repair_decrease(graph, dist, prev, frm, to, fuel):
+    alt = dist.get(frm, INF) + fuel
+    if alt < dist.get(to, INF):
+        dist[to] = alt
+        prev[to] = frm
+        _propagate(graph, dist, prev, [(alt, to)])
+
+
+def _repair_increase(graph, reverse, dist, prev, frm, to):
+    if prev.get(to) != frm:
+        return  # 不是樹上的邊，距離不受影響
+    # 1. 受影響的子樹
+    affected = {to}
+    stack = [to]
+    while stack:
+        y = stack.pop()
+        for x, _ in graph.get(y, []):
+            if x not in affected and prev.get(x) == y:
+                affected.add(x)
+                stack.append(x)
+    # 2. 只用子樹外的入邊估算新距離
+    heap = []
+    for x in affected:
+        best = INF
+        best_p = None
+        for p, w in reverse.get(x, []):
+            if p not in affected and dist.get(p, INF) + w < best:
+                best = dist[p] + w
+                best_p = p
+        dist[x] = best
+        prev[x] = best_p
+        if best != INF:
+            heap.append((best, x))
+    # 3. 子樹內重新 Dijkstra（子樹外的距離不會因為邊變貴而變短）
+    heapq.heapify(heap)
+    _propagate(graph, dist, prev, heap)
+
+
+# ----------------------------
+# Route operations
+# ----------------------------
+
+def add_planet(graph, reverse, name):
+    if name in graph:
+        raise ValueError(f"星球已存在：{name}")
+    graph[name] = []
+    reverse[name] = []
+
+
+def add_route(graph, reverse, frm, to, fuel, trees=()):
+    _check_planets(graph, frm, to)
+    if _find(graph, frm, to)[0] != -1:
+        raise ValueError(f"航道已存在：{frm} -> {to}")
+    graph[frm].append((to, fuel))
+    reverse.setdefault(to, []).append((frm, fuel))
+    for dist, prev in trees:
+        _repair_decrease(graph, dist, prev, frm, to, fuel)
+
+
+def remove_route(graph, reverse, frm, to, trees=()):
+    _check_planets(graph, frm, to)
+    i, _ = _find(graph, frm, to)
+    if i == -1:
+        raise ValueError(f"航道不存在：{frm} -> {to}")
+    del graph[frm][i]
+    j, _ = _find(reverse, to, frm)
+    del reverse[to][j]
+    for dist, prev in trees:
+        _repair_increase(graph, reverse, dist, prev, frm, to)
+
+
+def update_route(graph, reverse, frm, to, fuel, trees=()):
+    _check_planets(graph, frm, to)
+    i, old = _find(graph, frm, to)
+    if i == -1:
+        raise ValueError(f"航道不存在：{frm} -> {to}")
+    graph[frm][i] = (to, fuel)
+    j, _ = _find(reverse, to, frm)
+    reverse[to][j] = (frm, fuel)
+    for dist, prev in trees:
+        if fuel < old:
+            _repair_decrease(graph, dist, prev, frm, to, fuel)
+        elif fuel > old:
+            _repair_increase(graph, reverse, dist, prev, frm, to)
@@ -0,0 +1,203 @@
+# floyd.py
+# 稠密小地圖用的 Floyd–Warshall (min-plus) 距離矩陣 + 下一站矩陣，需要 NumPy (選用)
+#
+# 星球數 <= MAX_PLANETS 且航道密度夠高時，一次算出所有星球兩兩之間的最低燃料，
+# 之後每次查詢只要沿著 next_hop 走，O(路徑長度)。
+#
+# 分塊 (blocked) 版本，每個大小為 BLOCK 的區塊 K：
+#   1. 只更新「十字」區域 (K 的列與 K 的欄)，逐一以 k ∈ K 為中繼點；十字內的更新只用到十字本身
+#   2. 其餘格子做 min-plus：D[i, j] = min(D[i, j], min_k D[i, k] + D[k, j])，
+#      依列切成 cache 放得下的區段，區段內逐一以 k ∈ K 做整列向量化的 rank-1 更新
+# 距離以 float32 存放 (整數燃料總和 < 2^24 時是精確的)，無法抵達為 inf；next_hop 無法抵達為 -1。
+#
+# 建立一次要 O(n^3) (2000 個星球約 20 秒)，結果存成 <map>.fw，之後以 mmap 開啟：
+#   header   struct HEADER (magic, version, byteorder, 星球數, changelog.digest, names_digest)
+#   dist     float32 * n * n
+#   next     int32 * n * n
+
+import os
+import struct
+import sys
+
+import changelog
+import csr
+import snapshot
+
+MAGIC = b"SPMAPFW_"
+VERSION = 1
+HEADER = struct.Struct("<8sHB5xQ32s32s")
+_BYTEORDER = {"little": 0, "big": 1}[sys.byteorder]
+
+MAX_PLANETS = 5000
+DENSE_RATIO = 0.05          # 航道數 >= DENSE_RATIO * n^2 才算稠密
+BLOCK = 64
+CHUNK_BYTES = 1 << 20       # min-plus 每個列區段的大小 (約在 L2 cache 內)
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def available():
+    return _numpy() is not None
+
+
+def suitable(num_planets, num_routes):
+    # 星球不多、航道很多時，O(n^3) 的矩陣比對每個起點跑 Dijkstra 划算
+    return (available() and 0 < num_planets <= MAX_PLANETS
+            and num_routes >= DENSE_RATIO * num_planets * num_planets)
+
+
+def _rank1(np, d, h, col, row, k, cand, mask):
+    # d = min(d, col[:, k] + row)，有變短的格子下一站改成 h[:, k] 的下一站
+    np.add(col[:, k:k + 1], row[None, :], out=cand)
+    np.less(cand, d, out=mask)
+    np.copyto(d, cand, where=mask)
+    np.copyto(h, h[:, k:k + 1], where=mask)
+
+
+def _relax_cross(np, dist, nxt, k0, k1):
+    b = k1 - k0
+    n = dist.shape[0]
+    row_buf = (np.empty((b, n), dtype=dist.dtype), np.empty((b, n), dtype=bool))
+    col_d = np.ascontiguousarray(dist[:, k0:k1])
+    col_h = np.ascontiguousarray(nxt[:, k0:k1])
+    col_buf = (np.empty((n, b), dtype=dist.dtype), np.empty((n, b), dtype=bool))
+    for k in range(k0, k1):
+        # K 的列：經過 k 到所有星球
+        _rank1(np, dist[k0:k1], nxt[k0:k1], dist[k0:k1], dist[k], k, *row_buf)
+        # K 的欄：所有星球經過 k 到 K (在連續的副本上做，最後再寫回)
+        col_d[k0:k1] = dist[k0:k1, k0:k1]
+        col_h[k0:k1] = nxt[k0:k1, k0:k1]
+        _rank1(np, col_d, col_h, col_d, col_d[k], k - k0, *col_buf)
+        dist[:, k0:k1] = col_d
+        nxt[:, k0:k1] = col_h
+
+
+def _min_plus(np, dist, nxt, k0, k1):
+    # 依列切成放得進 cache 的區段，每段對 k ∈ K 逐一做 rank-1 更新；
+    # 十字區域已是最終值，各區段互不相依
+    n = dist.shape[0]
+    step = max(1, CHUNK_BYTES // (4 * n))
+    cand = np.empty((min(step, n), n), dtype=dist.dtype)
+    mask = np.empty(cand.shape, dtype=bool)
+    for r0 in range(0, n, step):
+        r1 = min(n, r0 + step)
+        d = dist[r0:r1]
+        h = nxt[r0:r1]
+        for k in range(k0, k1):
+            _rank1(np, d, h, d, dist[k], k, cand[:r1 - r0], mask[:r1 - r0])
+
+
+def build(graph, block=BLOCK):
+    """
+    回傳 {"names", "index", "dist", "next"}；沒有 NumPy 時印出提示並回傳 None。
+    graph 可以是 dict-of-lists 或 CSR。
+    """
+    np = _numpy()
+    if np is None:
+        print("Floyd–Warshall 需要 NumPy：pip install numpy")
+        return None
+    g = csr.from_graph(graph)
+    n = len(g["names"])
+    offsets = np.frombuffer(g["offsets"], dtype=np.int32)
+    targets = np.frombuffer(g["targets"], dtype=np.int32)
+    weights = np.frombuffer(g["weights"], dtype=np.int32).astype(np.float32)
+    sources = np.repeat(np.arange(n, dtype=np.int32), np.diff(offsets))
+
+    dist = np.full((n, n), np.inf, dtype=np.float32)
+    np.minimum.at(dist, (sources, targets), weights)
+    np.fill_diagonal(dist, 0)
+    nxt = np.where(np.isfinite(dist), np.arange(n, dtype=np.int32)[None, :], -1).astype(np.int32)
+
+    for start in range(0, n, block):
+        end = min(n, start + block)
+        _relax_cross(np, dist, nxt, start, end)
+        _min_plus(np, dist, nxt, start, end)
+
+    return {"names": g["names"], "index": g["index"], "dist": dist, "next": nxt}
+
+
+# ----------------------------
+# Persistence
+# ----------------------------
+
+def fw_path(filename):
+    return os.path.splitext(filename)[0] + ".fw"
+
+
+def save(fw, filename):
+    path = fw_path(filename)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, _BYTEORDER, len(fw["names"]), changelog.digest(filename),
+                            snapshot.names_digest(fw["names"])))
+        fw["dist"].tofile(f)
+        fw["next"].tofile(f)
+    os.replace(tmp, path)
+    return path
+
+
+def load(filename, graph):
+    """<map>.fw 存在且與目前地圖相符時以 mmap 開啟並回傳，否則回傳 None"""
+    np = _numpy()
+    path = fw_path(filename)
+    if np is None or not os.path.exists(path) or not os.path.exists(filename):
+        return None
+    names = graph["names"] if csr.is_csr(graph) else csr.from_graph(graph)["names"]
+    n = len(names)
+    with open(path, "rb") as f:
+        head = f.read(HEADER.size)
+    if len(head) < HEADER.size:
+        return None
+    magic, version, byteorder, num, digest, order_digest = HEADER.unpack(head)
+    if magic != MAGIC or version != VERSION or byteorder != _BYTEORDER or num != n:
+        return None
+    if digest != changelog.digest(filename) or order_digest != snapshot.names_digest(names):
+        return None
+    if os.path.getsize(path) != HEADER.size + 8 * n * n:
+        return None
+    dist = np.memmap(path, dtype=np.float32, mode="r", offset=HEADER.size, shape=(n, n))
+    nxt = np.memmap(path, dtype=np.int32, mode="r", offset=HEADER.size + 4 * n * n, shape=(n, n))
+    return {"names": names, "index": {p: i for i, p in enumerate(names)}, "dist": dist, "next": nxt}
+
+
+def load_or_build(filename, graph):
+    fw = load(filename, graph)
+    if fw is None:
+        n = len(graph["names"]) if csr.is_csr(graph) else len(graph)
+        print(f"建立 Floyd–Warshall 距離矩陣 ({n} 個星球，O(n^3)，完成後存成 {fw_path(filename)})...")
+        fw = build(graph)
+        if fw is not None:
+            try:
+                save(fw, filename)
+            except OSError as e:
+                print("無法寫入 Floyd–Warshall 矩陣：", e)
+    return fw
+
+
+# ----------------------------
+# Query
+# ----------------------------
+
+def query(fw, start, goal):
+    """回傳 (最低燃料, 路徑)；無法抵達時為 (inf, [])"""
+    index = fw["index"]
+    if start not in index or goal not in index:
+        return float('inf'), []
+    s = index[start]
+    t = index[goal]
+    cost = float(fw["dist"][s, t])
+    if cost == float('inf'):
+        return cost, []
+    names = fw["names"]
+    nxt = fw["next"]
+    path = [start]
+    while s != t:
+        s = int(nxt[s, t])
+        path.append(names[s])
+    return int(cost), path
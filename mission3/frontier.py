@@ -0,0 +1,233 @@
+# frontier.py
+# 以整層 frontier 為單位的 BFS (level-synchronous)，在 CSR 陣列上用 NumPy 向量化展開，需要 NumPy (選用)
+#
+# 方向最佳化 (Beamer's direction-optimizing BFS)，每一層依 frontier 大小選擇展開方向：
+#   top-down   從 frontier 沿出邊找未走過的星球，成本 ~ frontier 的出邊數 m_f
+#   bottom-up  每個未走過的星球沿入邊 (反向 CSR) 檢查有沒有前一站在 frontier 裡，成本 ~ 未走過星球的入邊數 m_u
+# m_f > m_u / ALPHA 時改用 bottom-up；frontier 縮小到 n / BETA 以下時改回 top-down。
+# 向量化的 bottom-up 無法像逐點版本一樣「找到一個前一站就停」，所以 ALPHA 比論文中的 14 小。
+#
+# dist 為 int32 陣列 (無法抵達為 -1)，parent 為上一站的 ID (起點與無法抵達為 -1)。
+
+import csr
+
+ALPHA = 4
+BETA = 24
+MIN_PLANETS = 20000         # 星球數少於此值時逐點的 BFS 比較快 (NumPy 每層有固定開銷)
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def available():
+    return _numpy() is not None
+
+
+def suitable(graph):
+    # CSR 大地圖且有 NumPy 時才值得改用向量化的 BFS
+    return csr.is_csr(graph) and len(graph["names"]) >= MIN_PLANETS and available()
+
+
+def _arrays(np, g):
+    # 直接包住 CSR 的 array / mmap，不複製
+    return np.frombuffer(g["offsets"], dtype=np.int32), np.frombuffer(g["targets"], dtype=np.int32)
+
+
+def _gather(np, offsets, targets, nodes):
+    # nodes 每個星球的所有鄰居；回傳 (鄰居, 對應的來源星球)
+    starts = offsets[nodes]
+    counts = offsets[nodes + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        empty = np.empty(0, dtype=np.int32)
+        return empty, empty
+    # 每條邊在 targets 中的位置 = 所屬星球的起點 + 在該星球內的序號
+    shift = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    edges = shift + np.arange(total, dtype=np.int32)
+    return targets[edges], np.repeat(nodes, counts)
+
+
+def _top_down(np, offsets, targets, frontier, dist, parent, level):
+    nbrs, srcs = _gather(np, offsets, targets, frontier)
+    fresh = dist[nbrs] == -1
+    nbrs = nbrs[fresh]
+    srcs = srcs[fresh]
+    # 同一個星球被多個前一站找到時任取一個 (後寫入的生效)，都是合法的 BFS 上一站
+    parent[nbrs] = srcs
+    dist[nbrs] = level
+    return np.unique(nbrs)
+
+
+def _bottom_up(np, r_offsets, r_targets, unvisited, in_frontier, dist, parent, level):
+    preds, owners = _gather(np, r_offsets, r_targets, unvisited)
+    hit = in_frontier[preds]
+    owners = owners[hit]
+    parent[owners] = preds[hit]
+    dist[owners] = level
+    return np.unique(owners)
+
+
+def search(graph, s, t=-1, reverse=None, stats=None):
+    """
+    從 ID s 出發的方向最佳化 BFS；t != -1 時抵達 t 那一層結束後就停止。
+    reverse 為轉置後的 CSR (可省略，省略時只做 top-down)。
+    回傳 (dist, parent) 兩個 NumPy int32 陣列；沒有 NumPy 時回傳 None。
+    stats 為 dict 時寫入 settled / relaxed / pushes / max_queue (見 probe.py)，另加 bottom_up 層數。
+    """
+    np = _numpy()
+    if np is None:
+        return None
+    n = len(graph["names"])
+    offsets, targets = _arrays(np, graph)
+    out_degree = np.diff(offsets)
+    if reverse is not None:
+        r_offsets, r_targets = _arrays(np, reverse)
+        in_degree = np.diff(r_offsets)
+        m_u = int(in_degree.sum()) - int(in_degree[s])
+    dist = np.full(n, -1, dtype=np.int32)
+    parent = np.full(n, -1, dtype=np.int32)
+    dist[s] = 0
+    frontier = np.array([s], dtype=np.int32)
+    unvisited = None
+    bottom_up = False
+    level = 0
+    settled = relaxed = peak = layers = 0
+
+    while frontier.size:
+        settled += frontier.size
+        peak = max(peak, int(frontier.size))
+        if t != -1 and dist[t] != -1:
+            break
+        level += 1
+        m_f = int(out_degree[frontier].sum())
+        if reverse is not None:
+            if not bottom_up and m_f > m_u / ALPHA:
+                bottom_up = True
+            elif bottom_up and frontier.size < n / BETA:
+                bottom_up = False
+        if bottom_up:
+            if unvisited is None:
+                unvisited = np.flatnonzero(dist == -1).astype(np.int32)
+            else:
+                unvisited = unvisited[dist[unvisited] == -1]
+            in_frontier = np.zeros(n, dtype=bool)
+            in_frontier[frontier] = True
+            relaxed += int(in_degree[unvisited].sum())
+            layers += 1
+            frontier = _bottom_up(np, r_offsets, r_targets, unvisited, in_frontier, dist, parent, level)
+        else:
+            relaxed += m_f
+            frontier = _top_down(np, offsets, targets, frontier, dist, parent, level)
+        if reverse is not None:
+            m_u -= int(in_degree[frontier].sum())
+
+    if stats is not None:
+        stats.update(settled=settled, relaxed=relaxed, pushes=int((dist != -1).sum()),
+                     max_queue=peak, bottom_up=layers)
+    return dist, parent
+
+
+def _bidirectional(np, graph, reverse, s, t, stats):
+    # 兩側輪流以 top-down 展開一整層 (選出邊較少的一側)；
+    # 某一層出現相遇點時，取該層中總長度最短的相遇點
+    n = len(graph["names"])
+    sides = []
+    for g, root in ((graph, s), (reverse, t)):
+        offsets, targets = _arrays(np, g)
+        dist = np.full(n, -1, dtype=np.int32)
+        dist[root] = 0
+        sides.append({"offsets": offsets, "targets": targets, "dist": dist,
+                      "link": np.full(n, -1, dtype=np.int32),
+                      "frontier": np.array([root], dtype=np.int32), "level": 0})
+    fwd, bwd = sides
+    meet = s if s == t else -1
+    settled = relaxed = peak = 0
+    pushes = 2
+
+    while meet == -1 and fwd["frontier"].size and bwd["frontier"].size:
+        peak = max(peak, int(fwd["frontier"].size + bwd["frontier"].size))
+        cost = [int((side["offsets"][side["frontier"] + 1] - side["offsets"][side["frontier"]]).sum())
+                for side in sides]
+        side, other = (fwd, bwd) if cost[0] <= cost[1] else (bwd, fwd)
+        settled += side["frontier"].size
+        relaxed += min(cost)
+        side["level"] += 1
+        side["frontier"] = _top_down(np, side["offsets"], side["targets"], side["frontier"],
+                                     side["dist"], side["link"], side["level"])
+        pushes += side["frontier"].size
+        found = side["frontier"][other["dist"][side["frontier"]] != -1]
+        if found.size:
+            meet = int(found[np.argmin(other["dist"][found])])
+
+    if stats is not None:
+        stats.update(settled=settled, relaxed=relaxed, pushes=pushes, max_queue=peak)
+    if meet == -1:
+        return []
+    names = graph["names"]
+    path = [meet]
+    parent = fwd["link"]
+    while parent[path[-1]] != -1:
+        path.append(int(parent[path[-1]]))
+    path.reverse()
+    child = bwd["link"]
+    while child[path[-1]] != -1:
+        path.append(int(child[path[-1]]))
+    return [names[v] for v in path]
+
+
+def bfs_path(graph, start, goal, reverse=None, stats=None):
+    """
+    與 csr.bfs_path 相同的介面；回傳星球名稱組成的最少跳躍路徑，到不了時為 []。
+    有 reverse 時兩端同時展開 (單一查詢通常只需要走很少層)，否則用方向最佳化 BFS 走到終點那一層。
+    """
+    np = _numpy()
+    index = graph["index"]
+    if np is None or start not in index or goal not in index:
+        return []
+    s = index[start]
+    t = index[goal]
+    if reverse is not None:
+        return _bidirectional(np, graph, reverse, s, t, stats)
+    dist, parent = search(graph, s, t, stats=stats)
+    if dist[t] == -1:
+        return []
+    names = graph["names"]
+    path = [t]
+    while parent[path[-1]] != -1:
+        path.append(int(parent[path[-1]]))
+    return [names[v] for v in reversed(path)]
+
+
+def hop_distances(graph, start, reverse=None):
+    """回傳 (dist, parent) NumPy 陣列 (以 CSR ID 為索引)；起點不存在時為 None"""
+    index = graph["index"]
+    if start not in index:
+        return None
+    return search(graph, index[start], reverse=reverse)
+
+
+def bfs_tree(graph, start, reverse=None):
+    # 與 csr.bfs_tree 相同：{星球: 上一站}（只含抵達得了的星球，起點的上一站為 None）
+    result = hop_distances(graph, start, reverse)
+    if result is None:
+        return {}
+    np = _numpy()
+    dist, parent = result
+    reached = np.flatnonzero(dist != -1)
+    names = graph["names"]
+    return {names[v]: (names[p] if p != -1 else None)
+            for v, p in zip(reached.tolist(), parent[reached].tolist())}
+
+
+def level_counts(graph, start, reverse=None):
+    """每一跳新抵達的星球數 [1, n1, n2, ...]；起點不存在時為 []"""
+    result = hop_distances(graph, start, reverse)
+    if result is None:
+        return []
+    dist = result[0]
+    return _numpy().bincount(dist[dist != -1]).tolist()
@@ -0,0 +1,109 @@
+# kpaths.py
+# 前 k 條最低燃料的無環路線 (Yen's algorithm)
+#
+# 每條替代路線 = 沿用前一條路線的前半段 (root) + 從岔出點 (spur) 重新找的後半段。
+# 共用的計算：
+#   - 先在反向圖上從終點跑一次 Dijkstra，得到每個星球到終點的最低燃料 h(v)。
+#     拿掉一些航道 / 星球只會讓距離變大，所以 h 是每次 spur 搜尋都能用的下界，
+#     spur 搜尋改成以 h 為啟發函數的 A*：沿著這棵最短路徑樹能直接走到終點時幾乎不用展開其他星球
+#   - root 成本 + h(spur) 已經不可能擠進前 k 名時，整個 spur 搜尋直接略過；
+#     A* 途中估計值超過門檻時也提前停止
+
+import heapq
+
+import csr
+
+INF = float('inf')
+
+
+def _weight(g, u, v):
+    offsets = g["offsets"]
+    targets = g["targets"]
+    weights = g["weights"]
+    return min(weights[k] for k in range(offsets[u], offsets[u + 1]) if targets[k] == v)
+
+
+def _spur(g, h, s, t, blocked_nodes, blocked_edges, limit):
+    """
+    從 s 到 t 的 A*，不經過 blocked_nodes / blocked_edges；
+    回傳 (燃料, [ID...])，找不到或一定 >= limit 時回傳 None。
+    """
+    offsets = g["offsets"]
+    targets = g["targets"]
+    weights = g["weights"]
+    dist = {s: 0}
+    parent = {s: -1}
+    heap = [(h[s], 0, s)]
+    while heap:
+        f, d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        if f >= limit:
+            return None
+        if u == t:
+            path = []
+            while u != -1:
+                path.append(u)
+                u = parent[u]
+            path.reverse()
+            return d, path
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets[k]
+            if v in blocked_nodes or (u, v) in blocked_edges or h[v] == INF:
+                continue
+            nd = d + weights[k]
+            if nd < dist.get(v, INF):
+                dist[v] = nd
+                parent[v] = u
+                heapq.heappush(heap, (nd + h[v], nd, v))
+    return None
+
+
+def yen(graph, start, goal, k=3, reverse=None):
+    """
+    回傳最多 k 條 [(燃料, [星球...]), ...]，依燃料由低到高排序；路線中不會重複經過同一個星球。
+    graph 可以是 dict-of-lists 或 CSR；reverse 為同一張圖轉置後的 CSR (可省略)。
+    """
+    g = csr.from_graph(graph)
+    index = g["index"]
+    names = g["names"]
+    if start not in index or goal not in index or k <= 0:
+        return []
+    s = index[start]
+    t = index[goal]
+    if reverse is None or not csr.is_csr(reverse):
+        reverse = csr.reverse(g)
+    h, _ = csr.dijkstra_ids(reverse, t)
+    if h[s] == INF:
+        return []
+
+    first = _spur(g, h, s, t, set(), set(), INF)
+    found = [first]                  # A：已確定的路線
+    candidates = []                  # B：(燃料, 路線 tuple)
+    seen = {tuple(first[1])}
+
+    while len(found) < k:
+        _, prev = found[-1]
+        root_cost = 0
+        for j in range(len(prev) - 1):
+            spur = prev[j]
+            root = prev[:j + 1]
+            # 需要的候選數已經夠了，門檻就是其中最差的那條
+            need = k - len(found)
+            limit = heapq.nsmallest(need, candidates)[-1][0] if len(candidates) >= need else INF
+            if root_cost + h[spur] < limit:
+                blocked_edges = {(p[j], p[j + 1]) for _, p in found
+                                 if len(p) > j + 1 and p[:j + 1] == root}
+                result = _spur(g, h, spur, t, set(root[:-1]), blocked_edges, limit - root_cost)
+                if result is not None:
+                    path = tuple(root[:-1]) + tuple(result[1])
+                    if path not in seen:
+                        seen.add(path)
+                        heapq.heappush(candidates, (root_cost + result[0], path))
+            root_cost += _weight(g, prev[j], prev[j + 1])
+        if not candidates:
+            break
+        cost, path = heapq.heappop(candidates)
+        found.append((cost, list(path)))
+
+    return [(cost, [names[i] for i in path]) for cost, path in found]
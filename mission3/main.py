@@ -1,8 +1,35 @@
 import random
 import json
 import os
+import sys
+import argparse
+import subprocess
+import contextlib
+import heapq
+import math
 from collections import deque
 from datetime import datetime
+from time import perf_counter
+
+import alt
+import apsp
+import batch
+import ch
+import changelog
+import csr
+import dotwriter
+import dynamic
+import floyd
+import frontier
+import kpaths
+import nameindex
+import namesort
+import pathcache
+import probe
+import reach
+import snapshot
+import sqlstore
+import streamjson
 
 
 from typing import Dict, List, Tuple, Optional
@@ -10,62 +37,153 @@ from typing import Dict, List, Tuple, Optional
 
 graph: Optional[Dict[str, List[Tuple[str, int]]]] = None
 planets: Optional[List[str]] = None
+reverse_graph: Optional[Dict[str, List[Tuple[str, int]]]] = None
+map_file: Optional[str] = None
+alt_index: Optional[dict] = None
+ch_index: Optional[dict] = None
+name_index: Optional[dict] = None
+reach_index: Optional[dict] = None
+fw_index: Optional[dict] = None
+change_log: Optional[dict] = None
+csr_view: Optional[tuple] = None    # (graph_version, CSR, 反向 CSR)，k 條路線查詢用
+graph_version = 0
+loaded_version = 0
+path_cache = pathcache.new_cache()
 
 # ----------------------------
 # Random data generator
 # ----------------------------
 
-def generate_random_space_data(num_planets=50, num_routes=120, filename="space_map.json"):
-    planets = [f"Planet_{i}" for i in range(num_planets)]
-
-    routes = []
-    existing = set()
-    attempts = 0
-    while len(routes) < num_routes and attempts < num_routes * 10:
-        a = random.choice(planets)
-        b = random.choice(planets)
-        if a == b:
-            attempts += 1
-            continue
-        key = (a, b)
-        if key in existing:
-            attempts += 1
-            continue
-        fuel_cost = random.randint(1, 50)
-        routes.append({"from": a, "to": b, "fuel": fuel_cost})
-        existing.add(key)
-
-    data = {"planets": planets, "routes": routes, "meta": {"generated_at": str(datetime.now())}}
-    with open(filename, "w",encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
-    print(f"Generated {len(planets)} planets and {len(routes)} routes -> {filename}")
+def _binomial(rng, n, p):
+    # 以幾何分布跳躍計算成功次數，期望 O(n*p) 步
+    if p >= 1.0:
+        return n
+    if p <= 0.0 or n <= 0:
+        return 0
+    log_q = math.log1p(-p)
+    count = 0
+    i = 0
+    while True:
+        i += int(math.log(1.0 - rng.random()) / log_q) + 1
+        if i > n:
+            return count
+        count += 1
+
+
+def generate_random_space_data(num_planets=50, num_routes=120, filename="space_map.json",
+                               seed=None, chunk_size=10000):
+    # 每個起點先抽出要分到幾條航道，再用 rng.sample 一次抽出不重複的終點：
+    # 不需要重試迴圈、也不需要 existing set，航道逐塊寫入檔案，記憶體用量固定
+    rng = random.Random(seed)
+    max_routes = num_planets * (num_planets - 1)
+    if num_routes > max_routes:
+        print(f"航道數 {num_routes} 超過上限 {max_routes}，改為產生 {max_routes} 條")
+        num_routes = max_routes
+
+    rnd = rng.random
+    written = 0
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write('{\n  "planets": [\n')
+        for lo in range(0, num_planets, chunk_size):
+            hi = min(lo + chunk_size, num_planets)
+            f.write(",\n".join(f'    "Planet_{i}"' for i in range(lo, hi)))
+            f.write(",\n" if hi < num_planets else "\n")
+        f.write('  ],\n  "routes": [\n')
+
+        buf = []
+        remaining = num_routes
+        for a in range(num_planets):
+            sources_left = num_planets - a
+            low = max(0, remaining - (sources_left - 1) * (num_planets - 1))
+            k = _binomial(rng, remaining, 1.0 / sources_left)
+            k = min(max(k, low), num_planets - 1, remaining)
+            remaining -= k
+            if not k:
+                continue
+            if k * 4 < num_planets:
+                # 稀疏：直接抽亂數，重複機率很低
+                picked = set()
+                while len(picked) < k:
+                    picked.add(int(rnd() * (num_planets - 1)))
+                targets = picked
+            else:
+                targets = rng.sample(range(num_planets - 1), k)
+            head = f'    {{"from": "Planet_{a}", "to": "Planet_'
+            for b in targets:
+                if b >= a:
+                    b += 1
+                buf.append(f'{head}{b}", "fuel": {int(rnd() * 50) + 1}}}')
+            if len(buf) >= chunk_size:
+                f.write((",\n" if written else "") + ",\n".join(buf))
+                written += len(buf)
+                buf = []
+        if buf:
+            f.write((",\n" if written else "") + ",\n".join(buf))
+            written += len(buf)
+
+        meta = {"generated_at": str(datetime.now()), "seed": seed}
+        f.write(f'\n  ],\n  "meta": {json.dumps(meta)}\n}}\n')
+    print(f"Generated {num_planets} planets and {written} routes -> {filename}")
 
 
 # ----------------------------
 # Load / Build Graph
 # ----------------------------
 
-def load_space_map(filename="space_map.json"):
+def load_space_map(filename="space_map.json", backend="dict"):
+    # backend="csr" 改用壓縮稀疏列格式 (見 csr.py)，適合百萬條航道以上的地圖；
+    # backend="sqlite" 改用磁碟上的 <map>.db (見 sqlstore.py)，適合放不進記憶體的地圖，
+    # 此時星球名稱留在資料庫裡，回傳的 planets 為 None
     if not os.path.exists(filename):
         print("Data file not found. Please generate or provide space_map.json")
         return None, None
-    with open(filename, "r",encoding="utf-8") as f:
-        data = json.load(f)
-
-    planets = data.get("planets", [])
-    graph = {p: [] for p in planets}  
-
-    for r in data.get("routes", []):
-        frm = r["from"]
-        to = r["to"]
-        fuel = r["fuel"]
-        if frm in graph:
-            graph[frm].append((to, fuel))
+    if backend == "sqlite":
+        return None, sqlstore.open_store(filename, echo=lambda msg: print(msg, file=sys.stderr))
+    # 以 streamjson 逐筆讀入，不會先把整份 routes 陣列解析成 dict；
+    # <map>.log 的編輯記錄 (見 changelog.py) 在讀入的同時套用
+    events = changelog.fold(streamjson.iter_space_map(filename), changelog.read(filename))
+    if backend == "csr":
+        # 先找 <map>.snap 快照 (見 snapshot.py)，JSON + 變更記錄的雜湊相符就直接 mmap
+        digest = changelog.digest(filename)
+        graph = snapshot.load(filename, digest)
+        if graph is not None:
+            return graph["names"], graph
+        builder = csr.new_builder()
+        for kind, item in events:
+            if kind == "planet":
+                csr.add_planet(builder, item)
+            else:
+                csr.add_route(builder, *item)
+        graph = csr.finish(builder)
+        try:
+            snapshot.save(graph, filename, digest)
+        except OSError as e:
+            print("無法寫入快照：", e)
+        return graph["names"], graph
+
+    planets = []
+    graph = {}
+    for kind, item in events:
+        if kind == "planet":
+            planets.append(item)
+            graph.setdefault(item, [])
         else:
-            graph[frm] = [(to, fuel)]
+            frm, to, fuel = item
+            if frm in graph:
+                graph[frm].append((to, fuel))
+            else:
+                graph[frm] = [(to, fuel)]
     return planets, graph
 
 
+def has_planet(graph, name):
+    if csr.is_csr(graph):
+        return csr.has_planet(graph, name)
+    if sqlstore.is_store(graph):
+        return sqlstore.has_planet(graph, name)
+    return name in graph
+
+
 # ----------------------------
 # Search: Linear / Binary
 # ----------------------------
@@ -77,13 +195,16 @@ def linear_search(arr, target):
     return -1
 
 
-def binary_search(sorted_arr, target):
+def binary_search(sorted_arr, target, key=namesort.natural_key):
+    # sorted_arr 須依 key 排好 (selection_sort / quicksort 都是自然排序)
+    target_key = key(target)
     left, right = 0, len(sorted_arr) - 1
     while left <= right:
         mid = (left + right) // 2
-        if sorted_arr[mid] == target:
+        mid_key = key(sorted_arr[mid])
+        if mid_key == target_key:
             return mid
-        elif sorted_arr[mid] < target:
+        elif mid_key < target_key:
             left = mid + 1
         else:
             right = mid - 1
@@ -96,83 +217,281 @@ def binary_search(sorted_arr, target):
 
 def selection_sort(arr):
     arr = arr[:]
+    keys = [namesort.natural_key(x) for x in arr]
     n = len(arr)
     for i in range(n):
         min_idx = i
         for j in range(i + 1, n):
-            if arr[j] < arr[min_idx]:
+            if keys[j] < keys[min_idx]:
                 min_idx = j
         arr[i], arr[min_idx] = arr[min_idx], arr[i]
+        keys[i], keys[min_idx] = keys[min_idx], keys[i]
     return arr
 
 
 def quicksort(arr):
-    if len(arr) <= 1:
-        return arr
-    pivot = arr[len(arr) // 2]
-    left = [x for x in arr if x < pivot]
-    mid  = [x for x in arr if x == pivot]
-    right = [x for x in arr if x > pivot]
-    return quicksort(left) + mid + quicksort(right)
+    # 自然排序 (Planet_2 < Planet_10) 的就地 introsort，見 namesort.py；
+    # 只複製一份 list，不再每層遞迴產生三個新 list，也不會碰到遞迴上限
+    return namesort.introsort(arr[:])
 
 
 # ----------------------------
 # BFS: shortest by hops
 # ----------------------------
 
-def bfs_path(graph, start, goal):
+def bfs_path(graph, start, goal, reverse=None):
+    # reverse 為 build_reverse_index 建好的反向索引；有提供時改用雙向 BFS
+    if not probe.enabled:
+        return _bfs_path(graph, start, goal, reverse)
+    stats = {}
+    t0 = perf_counter()
+    path = _bfs_path(graph, start, goal, reverse, stats)
+    probe.record("bfs", start, goal, stats, perf_counter() - t0)
+    return path
+
+
+def _bfs_path(graph, start, goal, reverse=None, stats=None):
+    if csr.is_csr(graph):
+        if frontier.suitable(graph):
+            return frontier.bfs_path(graph, start, goal, reverse, stats)
+        return csr.bfs_path(graph, start, goal, reverse, stats)
+    if sqlstore.is_store(graph):
+        return sqlstore.bfs_path(graph, start, goal, reverse, stats)
     if start not in graph or goal not in graph:
         return []
+    if reverse is not None:
+        return _bidirectional_bfs(graph, reverse, start, goal, stats)
     queue = deque([start])
     visited = set([start])
     parent = {start: None}
 
+    if stats is None:
+        # 量測關閉時走沒有計數的迴圈，不在每個星球上多付計數的成本
+        while queue:
+            node = queue.popleft()
+            if node == goal:
+                break
+            for neighbor, _ in graph.get(node, []):
+                if neighbor not in visited:
+                    visited.add(neighbor)
+                    parent[neighbor] = node
+                    queue.append(neighbor)
+    else:
+        settled = relaxed = peak = 0
+        while queue:
+            if len(queue) > peak:
+                peak = len(queue)
+            node = queue.popleft()
+            settled += 1
+            if node == goal:
+                break
+            edges = graph.get(node, [])
+            relaxed += len(edges)
+            for neighbor, _ in edges:
+                if neighbor not in visited:
+                    visited.add(neighbor)
+                    parent[neighbor] = node
+                    queue.append(neighbor)
+        stats.update(settled=settled, relaxed=relaxed, pushes=len(parent), max_queue=peak)
+
+    if goal not in parent:
+        return []
+    path = []
+    cur = goal
+    while cur is not None:
+        path.append(cur)
+        cur = parent.get(cur)
+    path.reverse()
+    return path
+
+
+def bfs_tree(graph, start, reverse=None):
+    # 從 start 出發的完整 BFS 樹 {星球: 上一站}，可直接交給 reconstruct_path
+    if csr.is_csr(graph):
+        if frontier.suitable(graph):
+            return frontier.bfs_tree(graph, start, reverse if csr.is_csr(reverse) else None)
+        return csr.bfs_tree(graph, start)
+    if start not in graph:
+        return {}
+    queue = deque([start])
+    parent = {start: None}
     while queue:
         node = queue.popleft()
-        if node == goal:
-            break
         for neighbor, _ in graph.get(node, []):
-            if neighbor not in visited:
-                visited.add(neighbor)
+            if neighbor not in parent:
                 parent[neighbor] = node
                 queue.append(neighbor)
+    return parent
 
-    if goal not in parent:
+
+def hop_levels(graph, start, reverse=None):
+    # 每一跳新抵達的星球數 [1, n1, n2, ...]，長度 - 1 即為 start 的離心率；起點不存在時為 []
+    if frontier.suitable(graph):
+        return frontier.level_counts(graph, start, reverse if csr.is_csr(reverse) else None)
+    if not (csr.has_planet(graph, start) if csr.is_csr(graph) else start in graph):
+        return []
+    seen = {start}
+    level = [start]
+    counts = []
+    while level:
+        counts.append(len(level))
+        nxt = []
+        for u in level:
+            for v, _ in (csr.routes_from(graph, u) if csr.is_csr(graph) else graph.get(u, [])):
+                if v not in seen:
+                    seen.add(v)
+                    nxt.append(v)
+        level = nxt
+    return counts
+
+
+def _expand_level(adj, front, dist, link, other_dist):
+    # 展開一整層；回傳下一層以及這一層中與另一側相遇、總長度最短的節點
+    nxt = []
+    meet = None
+    best = float('inf')
+    for u in front:
+        du = dist[u] + 1
+        for v, _ in adj.get(u, []):
+            if v not in dist:
+                dist[v] = du
+                link[v] = u
+                nxt.append(v)
+                if v in other_dist and du + other_dist[v] < best:
+                    best = du + other_dist[v]
+                    meet = v
+    return nxt, meet
+
+
+def _bidirectional_bfs(graph, reverse, start, goal, stats=None):
+    # 兩端同時往外長，每次展開較小的那一側，相遇即停
+    if start == goal:
+        return [start]
+    dist_f, dist_b = {start: 0}, {goal: 0}
+    parent, child = {start: None}, {goal: None}
+    front_f, front_b = [start], [goal]
+    meet = None
+    settled = relaxed = peak = 0
+
+    while front_f and front_b and meet is None:
+        forward = len(front_f) <= len(front_b)
+        settled += len(front_f) if forward else len(front_b)
+        peak = max(peak, len(front_f) + len(front_b))
+        if stats is not None:
+            adj = graph if forward else reverse
+            relaxed += sum(len(adj.get(u, ())) for u in (front_f if forward else front_b))
+        if forward:
+            front_f, meet = _expand_level(graph, front_f, dist_f, parent, dist_b)
+        else:
+            front_b, meet = _expand_level(reverse, front_b, dist_b, child, dist_f)
+
+    if stats is not None:
+        stats.update(settled=settled, relaxed=relaxed, pushes=len(dist_f) + len(dist_b),
+                     max_queue=peak)
+
+    if meet is None:
         return []
     path = []
-    cur = goal
+    cur = meet
     while cur is not None:
         path.append(cur)
-        cur = parent.get(cur)
+        cur = parent[cur]
     path.reverse()
+    cur = child[meet]
+    while cur is not None:
+        path.append(cur)
+        cur = child[cur]
     return path
 
 
+def build_reverse_index(graph):
+    # 反向鄰接表 {to: [(from, fuel), ...]}，格式與 graph 相同；CSR 圖則回傳轉置後的 CSR；
+    # SQLite 圖的入邊直接查 routes_in 索引，回傳 store 本身
+    if csr.is_csr(graph):
+        return csr.reverse(graph)
+    if sqlstore.is_store(graph):
+        return graph
+    reverse = {node: [] for node in graph}
+    for u in graph:
+        for v, w in graph[u]:
+            if v in reverse:
+                reverse[v].append((u, w))
+            else:
+                reverse[v] = [(u, w)]
+    return reverse
+
+
 # ----------------------------
 # Dijkstra: shortest by weight (fuel)
 # ----------------------------
 
-def dijkstra(graph, start):
+def dijkstra(graph, start, goal=None, skip=()):
+    # 二元堆積 + lazy deletion：同一節點可能被 push 多次，pop 出過時的項目就跳過
+    # 指定 goal 時，goal 一被 settle 就提前結束（其餘節點的 dist 只是暫定值）
+    # skip 中的星球 (CSR 圖為 ID) 不會被走到，例如 reach.blocked 算出、不在任何 start -> goal 路徑上的星球
+    if not probe.enabled:
+        return _dijkstra(graph, start, goal, skip=skip)
+    stats = {}
+    t0 = perf_counter()
+    result = _dijkstra(graph, start, goal, stats, skip)
+    probe.record("dijkstra", start, goal, stats, perf_counter() - t0)
+    return result
+
+
+def _dijkstra(graph, start, goal=None, stats=None, skip=()):
+    if csr.is_csr(graph):
+        return csr.dijkstra(graph, start, goal, stats, skip)
+    if sqlstore.is_store(graph):
+        return sqlstore.dijkstra(graph, start, goal, stats, skip)
     if start not in graph:
-        return {}
+        return {}, {}
     dist = {node: float('inf') for node in graph}
     prev = {node: None for node in graph}
+    # 先把 skip 的距離設成 -1，鬆弛時 alt < -1 永遠不成立，迴圈裡不需要額外判斷
+    for node in skip:
+        dist[node] = -1
     dist[start] = 0
-    visited = set()
+    heap = [(0, start)]
 
-    while len(visited) < len(graph):
-        candidates = [n for n in graph if n not in visited]
-        if not candidates:
-            break
-        u = min(candidates, key=lambda x: dist[x])
-        if dist[u] == float('inf'):
-            break
-        visited.add(u)
-        for v, w in graph.get(u, []):
-            alt = dist[u] + w
-            if alt < dist[v]:
-                dist[v] = alt
-                prev[v] = u
+    if stats is None:
+        # 量測關閉時走沒有計數的迴圈
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            if u == goal:
+                break
+            for v, w in graph.get(u, []):
+                alt = d + w
+                if alt < dist.get(v, float('inf')):
+                    dist[v] = alt
+                    prev[v] = u
+                    heapq.heappush(heap, (alt, v))
+    else:
+        # 計數只在每個 settle 的星球更新；heap 只在展開後變長，所以最大長度在這裡量就夠了
+        settled = relaxed = stale = peak = 0
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                stale += 1
+                continue
+            settled += 1
+            if u == goal:
+                break
+            edges = graph.get(u, [])
+            relaxed += len(edges)
+            for v, w in edges:
+                alt = d + w
+                if alt < dist.get(v, float('inf')):
+                    dist[v] = alt
+                    prev[v] = u
+                    heapq.heappush(heap, (alt, v))
+            if len(heap) > peak:
+                peak = len(heap)
+        stats.update(settled=settled, relaxed=relaxed, pushes=settled + stale + len(heap),
+                     max_queue=max(peak, 1))
+    for node in skip:
+        dist[node] = float('inf')
     return dist, prev
 
 
@@ -191,28 +510,188 @@ def reconstruct_path(prev, start, goal):
 
 
 # ----------------------------
-# Visualization using graphviz
+# Cached queries (menu 7 / 8)
 # ----------------------------
 
-def visualize_graphviz(graph, filename="space_map", engine='dot'):
-    
-    try:
-        from graphviz import Digraph
-    except ImportError:
-        print("請先安裝 python graphviz 套件：pip install graphviz")
-        return None
+def reverse_index():
+    # 反向索引；載入時不建立 (大地圖要數秒)，第一次需要時才建立
+    global reverse_graph
+    if reverse_graph is None and graph is not None:
+        reverse_graph = build_reverse_index(graph)
+    return reverse_graph
 
-    dot = Digraph(comment='Space Map', engine=engine)
-    dot.attr('node', shape='circle')
 
-    for node in graph:
-        dot.node(node, node)
+def reachability():
+    # SCC 可達性索引；載入時不建立，新增航道後會被清掉，下次查詢時 (重新) 建立
+    global reach_index
+    if reach_index is None and graph is not None:
+        reach_index = reach.build(graph)
+    return reach_index
 
-    for u in graph:
-        for v, w in graph[u]:
-            dot.edge(u, v, label=str(w))
 
-    output_path = dot.render(filename=filename, cleanup=True)
+def hop_route(start, goal):
+    # 同一起點第二次被查詢時，算出整棵 BFS 樹放進 path_cache，之後直接查表
+    if not reach.possible(reachability(), start, goal):
+        return []
+    parent = pathcache.get(path_cache, graph_version, start, "hops")
+    if parent is None and pathcache.should_admit(path_cache, graph_version, start, "hops"):
+        parent = bfs_tree(graph, start, reverse_index())
+        pathcache.put(path_cache, graph_version, start, "hops", (parent,))
+    elif parent is not None:
+        parent = parent[0]
+    if parent is None:
+        return bfs_path(graph, start, goal, reverse=reverse_index())
+    return reconstruct_path(parent, start, goal)
+
+
+def _route_count(graph):
+    if sqlstore.is_store(graph):
+        return sqlstore.num_routes(graph)
+    return csr.num_routes(graph) if csr.is_csr(graph) else sum(len(v) for v in graph.values())
+
+
+def fuel_route(start, goal):
+    # 回傳 (最低燃料, 路徑)；快取沒有時用 Floyd–Warshall 矩陣 (稠密小地圖)、CH (有 <map>.ch 時) 或 ALT 回答單一查詢
+    global alt_index, ch_index, fw_index
+    if not reach.possible(reachability(), start, goal):
+        return float('inf'), []
+    tree = pathcache.get(path_cache, graph_version, start, "fuel")
+    if tree is None and pathcache.should_admit(path_cache, graph_version, start, "fuel"):
+        tree = dijkstra(graph, start)
+        pathcache.put(path_cache, graph_version, start, "fuel", tree)
+    if tree is not None:
+        dist, prev = tree
+        cost = dist.get(goal, float('inf'))
+        return cost, (reconstruct_path(prev, start, goal) if cost != float('inf') else [])
+
+    if graph_version != loaded_version:
+        # 地圖在記憶體中被編輯過，磁碟上的 CH / ALT 索引已經不適用；
+        # 只在 start -> goal 路徑會經過的 SCC 裡搜尋
+        mask = reach.relevant(reachability(), start, goal)
+        if mask is None:
+            return float('inf'), []
+        dist, prev = dijkstra(graph, start, goal=goal, skip=reach.blocked(reach_index, mask))
+        cost = dist.get(goal, float('inf'))
+        return cost, (reconstruct_path(prev, start, goal) if cost != float('inf') else [])
+
+    if fw_index is None and floyd.suitable(len(planets), _route_count(graph)):
+        # 稠密地圖：<map>.fw 存在就直接 mmap，否則建立一次並存檔
+        if map_file is not None:
+            fw_index = floyd.load_or_build(map_file, graph)
+        else:
+            print(f"建立 Floyd–Warshall 距離矩陣 ({len(planets)} 個星球，O(n^3))...")
+            fw_index = floyd.build(graph)
+    if fw_index is not None:
+        return floyd.query(fw_index, start, goal)
+
+    if ch_index is None and alt_index is None:
+        ch_index = ch.load(map_file, graph)
+        if ch_index is None:
+            print("載入 / 建立 ALT 地標索引...")
+            alt_index = alt.load_or_build(map_file, graph)
+    if ch_index is not None:
+        return ch.query(ch_index, start, goal)
+    dist, prev = alt.astar(alt_index, start, goal)
+    cost = dist.get(goal, float('inf'))
+    return cost, (reconstruct_path(prev, start, goal) if cost != float('inf') else [])
+
+
+def _csr_view():
+    # dict 圖轉成的 CSR 與其轉置；同一個 graph_version 只轉換一次，編輯後下次查詢時重建
+    global csr_view
+    if csr_view is None or csr_view[0] != graph_version:
+        if csr.is_csr(graph):
+            csr_view = (graph_version, graph, reverse_index())
+        else:
+            g = csr.from_graph(graph)
+            csr_view = (graph_version, g, csr.reverse(g))
+    return csr_view[1], csr_view[2]
+
+
+def k_fuel_routes(start, goal, k):
+    # 前 k 條最低燃料的無環路線 [(燃料, 路徑), ...]
+    if not reach.possible(reachability(), start, goal):
+        return []
+    g, rev = _csr_view()
+    return kpaths.yen(g, start, goal, k, reverse=rev)
+
+
+def _log_change(rec):
+    # 編輯成功後才追加到 <map>.log；記錄太大時在背景併回 JSON
+    if change_log is None:
+        return
+    changelog.append(change_log, rec)
+    if changelog.should_compact(change_log) and changelog.compact_async(change_log) is not None:
+        print(f"變更記錄已達 {change_log['bytes'] / (1 << 20):.1f} MB，在背景併入 {change_log['map']}...")
+
+
+def add_planet(name):
+    # 新星球沒有任何航道，不影響既有的最短路徑，快取直接搬到新版本
+    global graph_version
+    if not name:
+        raise ValueError("星球名稱不可為空")
+    dynamic.add_planet(graph, reverse_index(), name)
+    planets.append(name)
+    _log_change({"op": "planet", "name": name})
+    pathcache.rekey(path_cache, graph_version, graph_version + 1, "fuel")
+    graph_version += 1
+    pathcache.discard_stale(path_cache, graph_version)
+
+
+def edit_route(op, frm, to, fuel=None):
+    # op: "add" / "remove" / "update"；快取中的燃料樹就地修復後搬到新版本，並追加到變更記錄
+    global graph_version, reach_index
+    trees = [tree for _, tree in pathcache.entries_for(path_cache, graph_version, "fuel")]
+    reverse = reverse_index()
+    if op == "add":
+        dynamic.add_route(graph, reverse, frm, to, fuel, trees)
+        # 新航道可能合併 SCC；刪除 / 修改只會讓可達範圍變小，舊索引不會誤判。
+        # 索引建好之後才新增的星球編號為 -1，兩端都是 -1 也必須重建
+        if reach_index is not None:
+            a = reach.component(reach_index, frm)
+            b = reach.component(reach_index, to)
+            if a == -1 or b == -1 or a != b:
+                reach_index = None
+    elif op == "remove":
+        dynamic.remove_route(graph, reverse, frm, to, trees)
+    elif op == "update":
+        dynamic.update_route(graph, reverse, frm, to, fuel, trees)
+    else:
+        raise ValueError(f"未知的操作：{op}")
+    rec = {"op": op, "from": frm, "to": to}
+    if op != "remove":
+        rec["fuel"] = fuel
+    _log_change(rec)
+    pathcache.rekey(path_cache, graph_version, graph_version + 1, "fuel")
+    graph_version += 1
+    pathcache.discard_stale(path_cache, graph_version)
+
+
+# ----------------------------
+# Visualization using graphviz
+# ----------------------------
+
+def visualize_graphviz(graph, filename="space_map", engine='dot', fmt="pdf",
+                       center=None, hops=2, path=None, sample=None, reverse=None,
+                       max_nodes=dotwriter.DEFAULT_MAX_NODES, max_edges=dotwriter.DEFAULT_MAX_EDGES):
+    # 以 dotwriter 逐行寫出 DOT 原始檔 (filename)，再盡量轉成圖檔 (filename.fmt)
+    # center / path / sample 用來只畫大地圖的一部分，見 dotwriter.select
+    # 回傳圖檔路徑；沒有產生圖檔 (只寫出 DOT 檔) 時回傳 None
+    nodes, routes, highlight = dotwriter.select(
+        graph, center=center, hops=hops, path=path, sample=sample, reverse=reverse,
+        max_nodes=max_nodes, max_edges=max_edges)
+    with open(filename, "w", encoding="utf-8") as f:
+        n_nodes, n_routes = dotwriter.write_dot(f, nodes, routes, highlight)
+    print(f"DOT 檔已寫入：{filename} ({n_nodes} planets, {n_routes} routes)")
+
+    try:
+        output_path = dotwriter.render(filename, fmt=fmt, engine=engine)
+    except subprocess.CalledProcessError as e:
+        print("GraphViz 轉檔失敗：", e)
+        return None
+    if output_path is None:
+        print(f"找不到 graphviz 套件或 {engine} 執行檔，只輸出 DOT 檔（可用 {engine} -T{fmt} 自行轉檔）")
+        return None
     print(f"GraphViz 圖檔已產生：{output_path}")
     return output_path
 
@@ -222,12 +701,19 @@ def visualize_graphviz(graph, filename="space_map", engine='dot'):
 # Utility: print small summary
 # ----------------------------
 
+def planet_index():
+    # 名稱索引只在 planets 換掉 (重新載入) 時重建，之後列出 / 排序 / 搜尋都直接查
+    global name_index
+    if not nameindex.is_current(name_index, planets):
+        name_index = nameindex.build(planets)
+    return name_index
+
+
 def summary(planets, graph):
     if planets is None or graph is None:
         print("No data loaded.")
         return
-    total_edges = sum(len(v) for v in graph.values())
-    print(f"Planets: {len(planets)} | Routes: {total_edges}")
+    print(f"Planets: {len(planets)} | Routes: {_route_count(graph)}")
 
 
 # ----------------------------
@@ -236,7 +722,8 @@ def summary(planets, graph):
 
 def cli_menu():
     
-    global planets, graph
+    global planets, graph, reverse_graph, map_file, alt_index, ch_index, fw_index, reach_index, graph_version, loaded_version
+    global change_log
     filename = "space_map.json"
     menu = """
     
@@ -251,6 +738,8 @@ Space Navigation CLI
 7) BFS (最少跳躍) 路徑
 8) Dijkstra (最低燃料) 到特定星球
 9) 視覺化 (GraphViz)
+10) 編輯航道 (新增 / 刪除 / 修改燃料 / 新增星球，寫入變更記錄)
+11) 搜尋量測 (開關 / 彙總 / 匯出)
 0) 離開程式
 """
 
@@ -264,6 +753,7 @@ Space Navigation CLI
             
             filename_input = input("輸入生成檔案名稱（不含副檔名，預設: space_map）: ").strip() or "space_map"
             filename = f"{filename_input}.json"
+            seed = input("亂數種子（可留空）: ").strip() or None
 
             try:
                 n = int(n)
@@ -272,7 +762,11 @@ Space Navigation CLI
                 if n <= 0 or m <= 0:
                     raise ValueError("數量必須為正整數")
 
-                generate_random_space_data(n, m, filename)
+                if change_log is not None and os.path.abspath(change_log["map"]) == os.path.abspath(filename):
+                    # 覆寫目前地圖的 JSON 後，既有的變更記錄不再適用
+                    changelog.close(change_log)
+                    change_log = None
+                generate_random_space_data(n, m, filename, seed=int(seed) if seed else None)
 
             except ValueError as e:
                 print("輸入錯誤：", e)
@@ -299,12 +793,39 @@ Space Navigation CLI
                     continue
                 filename = files[sel-1]
                 break
-            planets, graph = load_space_map(filename)
+            if os.path.exists(snapshot.snapshot_path(filename)):
+                print("（此地圖已有快照，使用 CSR 格式可直接 mmap 載入）")
+            backend = "csr" if input("使用 CSR 精簡格式載入？(y/N): ").strip().lower() == 'y' else "dict"
+            if change_log is not None:
+                # 等背景的壓縮寫完，才不會讀到換到一半的 JSON / log
+                changelog.close(change_log)
+                change_log = None
+            planets, graph = load_space_map(filename, backend=backend)
             if planets is not None:
+                # 反向索引與 SCC 可達性索引在第一次查詢 / 編輯時才建立 (見 reverse_index / reachability)
+                reverse_graph = reach_index = None
+                map_file = filename
+                if backend == "dict":
+                    change_log = changelog.open_log(filename)
+                    if change_log["records"]:
+                        print(f"已套用 {len(change_log['records'])} 筆變更記錄 ({change_log['path']})")
+                alt_index = ch_index = fw_index = None
+                graph_version += 1
+                loaded_version = graph_version
+                pathcache.discard_stale(path_cache, graph_version)
                 print("載入完成。")
 
         elif choice == '3':
             summary(planets, graph)
+            st = pathcache.stats(path_cache)
+            print(f"路徑快取: {st['entries']} 棵樹, {st['bytes'] / (1 << 20):.1f}/{st['max_bytes'] / (1 << 20):.0f} MB | "
+                  f"hit {st['hits']} / miss {st['misses']} ({st['hit_rate']:.0%}) | evicted {st['evictions']}")
+            if change_log is not None:
+                print(f"變更記錄: {len(change_log['records'])} 筆, {change_log['bytes'] / 1024:.1f} KB ({change_log['path']})")
+            if reach_index is not None:
+                st = reach.stats(reach_index)
+                print(f"強連通元件: {st['components']} 個 (最大 {st['largest']} 個星球，"
+                      f"單一星球 {st['singletons']} 個) | 縮點 DAG {st['dag_edges']} 條邊")
 
         elif choice == '4':
             if not isinstance(planets, list):
@@ -324,7 +845,11 @@ Space Navigation CLI
 
                 break
 
-            print(planets[:N])
+            text = input("名稱前綴（可留空，留空則依載入順序列出）: ").strip()
+            if text:
+                print(nameindex.prefix(planet_index(), text, limit=N))
+            else:
+                print(planets[:N])
 
 
         elif choice == '5':
@@ -335,8 +860,9 @@ Space Navigation CLI
             
             while True:
                 print("a) Selection Sort")
-                print("b) Quicksort")
-                t = input("選擇排序方法 (a/b): ").strip().lower()
+                print("b) Quicksort (introsort，自然排序)")
+                print("c) 名稱索引 (已排序，不重新排序)")
+                t = input("選擇排序方法 (a/b/c): ").strip().lower()
 
                 if t == 'a':
                     sorted_result = selection_sort(planets)
@@ -347,9 +873,14 @@ Space Navigation CLI
                     sorted_result = quicksort(planets)
                     method_name = "Quicksort"
                     break
+
+                elif t == 'c':
+                    sorted_result = planet_index()["sorted"]
+                    method_name = "Name Index"
+                    break
                 
                 else:
-                    print("輸入錯誤，請輸入 a 或 b")
+                    print("輸入錯誤，請輸入 a、b 或 c")
 
             
             while True:
@@ -390,14 +921,22 @@ Space Navigation CLI
                 print("Not found ")
 
             print("Binary Search ")
-            sorted_planets = quicksort(planets)
-            idx2 = binary_search(sorted_planets, target)
+            index = planet_index()
+            idx2 = binary_search(index["sorted"], target)
             
             if idx2 >= 0:
                 print(f"Found in sorted list at index {idx2}")
             else:
                 print("Not found in sorted list")
 
+            print("Hash Index")
+            idx3 = nameindex.find(index, target)
+            if idx3 >= 0:
+                print(f"Found at index {idx3} (sorted position {nameindex.rank(index, target)})")
+            else:
+                matches = nameindex.prefix(index, target, limit=10)
+                print("Not found" + (f"，以此為前綴的星球：{matches}" if matches else ""))
+
         elif choice == '7':
             if not isinstance(graph, dict):
                 print("請先載入資料 (選項2)。")
@@ -406,12 +945,12 @@ Space Navigation CLI
             while True:
                 s = input("起點: ").strip()
                 g = input("終點: ").strip()
-                if s not in graph or g not in graph:
+                if not has_planet(graph, s) or not has_planet(graph, g):
                     print("節點不存在，請重新輸入")
                     continue
                 break
             
-            path = bfs_path(graph, s, g)
+            path = hop_route(s, g)
             if path:
                 print(f"BFS 最少跳躍路徑 ({len(path)-1} hops):", " -> ".join(path))
             else:
@@ -426,18 +965,27 @@ Space Navigation CLI
                 s = input("起點: ").strip()
                 g = input("終點: ").strip()
                 
-                if s not in graph or g not in graph:
+                if not has_planet(graph, s) or not has_planet(graph, g):
                     print("節點不存在或無法抵達，請重新輸入")
                     continue
                 break
             
-            dist, prev = dijkstra(graph, s)
+            k = input("列出幾條路線？（預設1，大於1時另外列出替代路線）: ").strip()
+            k = int(k) if k.isdigit() and int(k) > 0 else 1
+            if k > 1:
+                routes = k_fuel_routes(s, g, k)
+                if not routes:
+                    print("無法抵達")
+                for i, (cost, path) in enumerate(routes, 1):
+                    print(f"#{i} 燃料 {cost}:", " -> ".join(path))
+                continue
+
+            cost, path = fuel_route(s, g)
             
-            if g not in dist or dist[g] == float('inf'):
+            if cost == float('inf'):
                 print("無法抵達")
             else:
-                path = reconstruct_path(prev, s, g)
-                print(f"最低燃料總量: {dist[g]}")
+                print(f"最低燃料總量: {cost}")
                 print("路徑:", " -> ".join(path))
 
         elif choice == '9':
@@ -446,16 +994,376 @@ Space Navigation CLI
                 continue
 
             out = input("輸出檔名(不含副檔名) 預設: space_map_viz: ").strip() or 'space_map_viz'
+            print("a) 全圖 (超過 500 個星球時只畫度數最高的星球)")
+            print("b) 某星球周圍 k 跳")
+            print("c) 最短路徑 (標成紅色)")
+            print("d) 依燃料加權抽樣航道")
+            mode = input("選擇範圍 (a/b/c/d，預設 a): ").strip().lower() or 'a'
+            options = {}
+            if mode in ('b', 'c'):
+                s = input("起點: ").strip()
+                if not has_planet(graph, s):
+                    print("節點不存在")
+                    continue
+                hops = input("周圍幾跳？預設 " + ("2" if mode == 'b' else "0") + ": ").strip()
+                options["hops"] = int(hops) if hops.isdigit() else (2 if mode == 'b' else 0)
+                if mode == 'b':
+                    options["center"] = s
+                    options["reverse"] = reverse_index()
+                else:
+                    g = input("終點: ").strip()
+                    if not has_planet(graph, g):
+                        print("節點不存在")
+                        continue
+                    _, path = fuel_route(s, g)
+                    if not path:
+                        print("找不到路徑")
+                        continue
+                    options["path"] = path
+            elif mode == 'd':
+                options["sample"] = "weight"
+            elif mode != 'a':
+                print("輸入錯誤，請輸入 a / b / c / d")
+                continue
             print("正在產生 GraphViz 圖檔...")
 
-            res = visualize_graphviz(graph, filename=out)
+            res = visualize_graphviz(graph, filename=out, **options)
             if res:
                 print("完成，可使用檔案總管開啟圖檔")
+            else:
+                print(f"沒有產生圖檔，只寫出 DOT 檔：{os.path.abspath(out)}")
+
+        elif choice == '10':
+            if not isinstance(graph, dict):
+                print("請先載入資料 (選項2)。")
+                continue
+            if csr.is_csr(graph):
+                print("CSR 格式為唯讀，請以一般格式重新載入後再編輯。")
+                continue
+
+            op = input("a) 新增航道  r) 刪除航道  u) 修改燃料  p) 新增星球  c) 併入變更記錄: ").strip().lower()
+            ops = {'a': "add", 'r': "remove", 'u': "update"}
+            if op == 'p':
+                try:
+                    add_planet(input("星球名稱: ").strip())
+                    print("星球已新增。")
+                except ValueError as e:
+                    print("輸入錯誤：", e)
+                continue
+            if op == 'c':
+                if change_log is None or not change_log["records"]:
+                    print("沒有需要併入的變更記錄。")
+                elif changelog.compact_async(change_log) is None:
+                    print("已經在背景併入中。")
+                else:
+                    print(f"在背景把 {len(change_log['records'])} 筆變更記錄併入 {change_log['map']}...")
+                continue
+            if op not in ops:
+                print("輸入錯誤，請輸入 a / r / u / p / c")
+                continue
+            s = input("起點: ").strip()
+            g = input("終點: ").strip()
+            try:
+                fuel = None
+                if op != 'r':
+                    fuel = int(input("燃料: ").strip())
+                    if fuel <= 0:
+                        raise ValueError("燃料必須為正整數")
+                edit_route(ops[op], s, g, fuel)
+                print("航道已更新。")
+            except ValueError as e:
+                print("輸入錯誤：", e)
+
+        elif choice == '11':
+            print(f"量測目前{'開啟' if probe.enabled else '關閉'}，已記錄 {len(probe.records)} 筆")
+            op = input("t) 開關  s) 彙總表  e) 匯出 JSONL  c) 清除: ").strip().lower()
+            if op == 't':
+                probe.enable(not probe.enabled)
+                print(f"量測已{'開啟' if probe.enabled else '關閉'}")
+            elif op == 's':
+                probe.print_summary()
+            elif op == 'e':
+                out = input("輸出檔名 預設: probe.jsonl: ").strip() or 'probe.jsonl'
+                with open(out, "w", encoding="utf-8") as f:
+                    probe.write_jsonl(f)
+                print(f"已寫入 {out}")
+            elif op == 'c':
+                probe.reset()
+            else:
+                print("輸入錯誤，請輸入 t / s / e / c")
 
         elif choice == '0':
+            if change_log is not None:
+                changelog.close(change_log)
             print("Goodbye,World.")
             break
 
 
+# ----------------------------
+# Scripting CLI (argparse)
+# ----------------------------
+
+def _open_in(path):
+    # "-" 代表 stdin / stdout；用 nullcontext 包起來，with 結束時才不會把它們關掉
+    if path in (None, "-"):
+        return contextlib.nullcontext(sys.stdin)
+    return open(path, "r", encoding="utf-8")
+
+
+def _open_out(path):
+    if path in (None, "-"):
+        return contextlib.nullcontext(sys.stdout)
+    return open(path, "w", encoding="utf-8")
+
+
+def _load_for_cli(args):
+    if not os.path.exists(args.map):
+        print(f"找不到地圖檔：{args.map}", file=sys.stderr)
+        return None, None
+    return load_space_map(args.map, backend=args.backend)
+
+
+def _cmd_generate(args):
+    generate_random_space_data(args.planets, args.routes, args.output, seed=args.seed)
+    return 0
+
+
+def _cmd_load(args):
+    planets, graph = _load_for_cli(args)
+    if graph is None:
+        return 1
+    num = sqlstore.num_planets(graph) if sqlstore.is_store(graph) else len(planets)
+    with _open_out(args.output) as out:
+        out.write(json.dumps({"map": args.map, "backend": args.backend,
+                              "planets": num, "routes": _route_count(graph)}) + "\n")
+    return 0
+
+
+def _cmd_bfs(args):
+    _, graph = _load_for_cli(args)
+    if graph is None:
+        return 1
+    reverse = build_reverse_index(graph)
+    # SQLite 圖不整張讀進記憶體，不建可達性索引
+    index = None if sqlstore.is_store(graph) else reach.build(graph)
+    with _open_in(args.input) as f:
+        queries = batch.read_queries(f)
+    with _open_out(args.output) as out:
+        for i, (start, goal) in enumerate(queries):
+            possible = index is None or reach.possible(index, start, goal)
+            path = bfs_path(graph, start, goal, reverse=reverse) if possible else []
+            out.write(json.dumps({"id": i, "start": start, "goal": goal,
+                                  "hops": len(path) - 1 if path else None, "path": path},
+                                 ensure_ascii=False) + "\n")
+    return 0
+
+
+def _cmd_hops(args):
+    _, graph = _load_for_cli(args)
+    if graph is None:
+        return 1
+    reverse = build_reverse_index(graph)
+    with _open_in(args.input) as f, _open_out(args.output) as out:
+        for line in f:
+            start = line.strip()
+            if not start:
+                continue
+            levels = hop_levels(graph, start, reverse)
+            out.write(json.dumps({"start": start, "reachable": sum(levels),
+                                  "max_hops": len(levels) - 1 if levels else None, "levels": levels},
+                                 ensure_ascii=False) + "\n")
+    return 0
+
+
+def _cmd_dijkstra(args):
+    _, graph = _load_for_cli(args)
+    if graph is None:
+        return 1
+    with _open_in(args.input) as f:
+        queries = batch.read_queries(f)
+    with _open_out(args.output) as out:
+        batch.run_batch(graph, queries, out, with_path=not args.no_path)
+    return 0
+
+
+def _cmd_kpaths(args):
+    _, graph = _load_for_cli(args)
+    if graph is None:
+        return 1
+    g = csr.from_graph(graph)
+    rev = csr.reverse(g)
+    with _open_in(args.input) as f:
+        queries = batch.read_queries(f)
+    with _open_out(args.output) as out:
+        for i, (start, goal) in enumerate(queries):
+            routes = kpaths.yen(g, start, goal, args.k, reverse=rev)
+            out.write(json.dumps({"id": i, "start": start, "goal": goal,
+                                  "routes": [{"fuel": c, "path": p} for c, p in routes]},
+                                 ensure_ascii=False) + "\n")
+    return 0
+
+
+def _cmd_apsp(args):
+    _, graph = _load_for_cli(args)
+    if graph is None:
+        return 1
+    apsp.run(graph, args.output or apsp.matrix_path(args.map), args.map,
+             workers=args.workers, chunk=args.chunk)
+    return 0
+
+
+def _cmd_compact(args):
+    if not os.path.exists(args.map):
+        print(f"找不到地圖：{args.map}", file=sys.stderr)
+        return 1
+    log = changelog.open_log(args.map)
+    merged = changelog.compact(log, echo=lambda msg: print(msg, file=sys.stderr))
+    changelog.close(log)
+    print(json.dumps({"map": args.map, "merged": merged}, ensure_ascii=False))
+    return 0
+
+
+def _cmd_search(args):
+    planets, graph = _load_for_cli(args)
+    if graph is None:
+        return 1
+    index = nameindex.build(planets)
+    with _open_in(args.input) as f, _open_out(args.output) as out:
+        for line in f:
+            name = line.strip()
+            if not name:
+                continue
+            if args.prefix:
+                result = {"prefix": name, "matches": nameindex.prefix(index, name, args.limit or None)}
+            else:
+                result = {"name": name, "index": nameindex.find(index, name),
+                          "sorted": nameindex.rank(index, name)}
+                if args.compare:
+                    result["linear"] = linear_search(planets, name)
+                    result["binary"] = binary_search(index["sorted"], name)
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+    return 0
+
+
+def _cmd_sort(args):
+    planets, graph = _load_for_cli(args)
+    if graph is None:
+        return 1
+    if args.method == "selection":
+        result = selection_sort(planets)
+    elif args.method == "quicksort":
+        result = quicksort(planets)
+    else:
+        result = nameindex.build(planets)["sorted"]
+    if args.limit:
+        result = result[:args.limit]
+    with _open_out(args.output) as out:
+        out.write("\n".join(result) + "\n")
+    return 0
+
+
+def _cmd_viz(args):
+    _, graph = _load_for_cli(args)
+    if graph is None:
+        return 1
+    path = None
+    if args.path:
+        start, goal = args.path
+        dist, prev = dijkstra(graph, start, goal=goal)
+        if dist.get(goal, float('inf')) == float('inf'):
+            print(f"找不到路徑：{start} -> {goal}", file=sys.stderr)
+            return 1
+        path = reconstruct_path(prev, start, goal)
+    if args.center is not None and not has_planet(graph, args.center):
+        print(f"節點不存在：{args.center}", file=sys.stderr)
+        return 1
+    # 沒有 GraphViz 時只輸出 DOT 檔也算完成 (見 viz 的說明)
+    visualize_graphviz(graph, filename=args.output, engine=args.engine, fmt=args.format,
+                       center=args.center, hops=args.hops, path=path, sample=args.sample,
+                       reverse=build_reverse_index(graph) if args.center else None,
+                       max_nodes=args.max_nodes, max_edges=args.max_edges)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Space Navigation：不帶參數執行會進入互動選單；帶子命令則以批次模式執行。")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("generate", help="生成隨機地圖")
+    p.add_argument("--planets", type=int, default=50)
+    p.add_argument("--routes", type=int, default=120)
+    p.add_argument("--seed", type=int, default=None)
+    p.add_argument("-o", "--output", default="space_map.json")
+    p.set_defaults(func=_cmd_generate)
+
+    def map_command(name, func, help_text, io=True, sqlite=False):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("map", help="地圖 JSON 檔")
+        p.add_argument("--backend", choices=("dict", "csr", "sqlite") if sqlite else ("dict", "csr"), default="csr",
+                       help="sqlite：磁碟上的 <map>.db，第一次使用時自動匯入" if sqlite else None)
+        if io:
+            p.add_argument("-i", "--input", default="-", help="查詢檔，預設 stdin")
+        p.add_argument("-o", "--output", default="-", help="輸出檔，預設 stdout")
+        p.add_argument("--probe-log", default=None,
+                       help="把每次搜尋的量測 (settled / relaxed / pushes / max_queue / 時間) 以 JSONL 寫入此檔")
+        p.add_argument("--probe-summary", action="store_true", help="結束時在 stderr 印出量測彙總表")
+        p.set_defaults(func=func)
+        return p
+
+    map_command("load", _cmd_load, "載入地圖並輸出摘要 (CSR 會順便建立快照，SQLite 會建立 <map>.db)",
+                io=False, sqlite=True)
+    map_command("bfs", _cmd_bfs, "最少跳躍路徑，每行一組 '起點 終點'，輸出 JSONL", sqlite=True)
+    map_command("hops", _cmd_hops, "每行一個起點，輸出整張地圖的跳數分布 (每一跳新抵達的星球數)，輸出 JSONL")
+    p = map_command("dijkstra", _cmd_dijkstra, "最低燃料路徑，依起點分組批次計算，輸出 JSONL", sqlite=True)
+    p.add_argument("--no-path", action="store_true", help="只輸出燃料，不輸出路徑")
+    p = map_command("kpaths", _cmd_kpaths, "前 k 條最低燃料的無環路線 (Yen)，每行一組 '起點 終點'，輸出 JSONL")
+    p.add_argument("-k", type=int, default=3)
+    p = map_command("apsp", _cmd_apsp, "平行計算所有起點的最低燃料，寫成 mmap 距離矩陣 (<map>.dist)", io=False)
+    p.set_defaults(output=None)
+    p.add_argument("--workers", type=int, default=None, help="process 數，預設為 CPU 數")
+    p.add_argument("--chunk", type=int, default=16, help="每批交給 worker 的起點數")
+    p = sub.add_parser("compact", help="把 <map>.log 的變更記錄併入地圖 JSON，log 清空")
+    p.add_argument("map", help="地圖 JSON 檔")
+    p.set_defaults(func=_cmd_compact)
+    p = map_command("search", _cmd_search, "每行一個星球名稱，輸出在原始清單 / 排序後清單中的位置")
+    p.add_argument("--prefix", action="store_true", help="每行視為名稱前綴，輸出符合的星球")
+    p.add_argument("--limit", type=int, default=0, help="--prefix 時每個前綴最多輸出幾筆")
+    p.add_argument("--compare", action="store_true", help="同時輸出 linear / binary search 的結果")
+    p = map_command("sort", _cmd_sort, "排序星球名稱，每行輸出一個", io=False)
+    p.add_argument("--method", choices=("selection", "quicksort", "index"), default="quicksort")
+    p.add_argument("--limit", type=int, default=0)
+    p = map_command("viz", _cmd_viz, "輸出 DOT 檔 (有 GraphViz 時一併轉成圖檔)", io=False)
+    p.set_defaults(output="space_map_viz")
+    p.add_argument("--center", default=None, help="只畫此星球周圍 --hops 跳內的星球")
+    p.add_argument("--hops", type=int, default=2)
+    p.add_argument("--path", nargs=2, metavar=("START", "GOAL"), default=None,
+                   help="畫出最低燃料路徑 (標成紅色)，周圍 --hops 跳")
+    p.add_argument("--sample", choices=("degree", "weight"), default=None,
+                   help="degree：度數最高的星球；weight：依燃料加權抽樣航道")
+    p.add_argument("--max-nodes", type=int, default=dotwriter.DEFAULT_MAX_NODES)
+    p.add_argument("--max-edges", type=int, default=dotwriter.DEFAULT_MAX_EDGES)
+    p.add_argument("--format", default="pdf", help="圖檔格式，預設 pdf")
+    p.add_argument("--engine", default="dot")
+    return parser
+
+
+def run_cli(argv=None):
+    args = build_parser().parse_args(argv)
+    probe_log = getattr(args, "probe_log", None)
+    probe_summary = getattr(args, "probe_summary", False)
+    if probe_log or probe_summary:
+        probe.enable()
+    code = args.func(args)
+    if probe_log:
+        with open(probe_log, "w", encoding="utf-8") as f:
+            probe.write_jsonl(f)
+    if probe_summary:
+        probe.print_summary(sys.stderr)
+    return code
+
+
 if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        sys.exit(run_cli())
     cli_menu()
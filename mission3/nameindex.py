@@ -0,0 +1,58 @@
+# nameindex.py
+# 星球名稱索引：每份載入的地圖只建一次，供列出 / 排序 / 搜尋共用
+#
+#   sorted  自然排序的名稱 (Planet_2 < Planet_10，與 quicksort / binary_search 相同順序)
+#   lex     一般字串排序的名稱，前綴查詢用 (同一前綴的名稱在自然排序下不一定相鄰)
+#   rank    {名稱: 在 sorted 中的位置}   精確查詢 O(1)
+#   order   {名稱: 在原始 planets 中的位置}
+#
+# 前綴查詢在 lex、範圍查詢在 sorted 上二分搜尋，O(log n + 結果數)。
+# 名稱清單變動 (重新載入地圖) 時索引就失效，由 is_current 判斷後重建。
+
+from bisect import bisect_left, bisect_right
+
+import namesort
+
+_MAX_CHAR = "\U0010ffff"
+
+
+def build(names):
+    ordered = sorted(names, key=namesort.natural_key)
+    return {"source": names, "size": len(names), "sorted": ordered, "lex": sorted(names),
+            "rank": {name: i for i, name in enumerate(ordered)},
+            "order": {name: i for i, name in enumerate(names)}}
+
+
+def is_current(index, names):
+    # 地圖重新載入時 planets 會換成新的 list；同一個 list 被增減時長度會不同
+    return index is not None and index["source"] is names and index["size"] == len(names)
+
+
+def find(index, name):
+    """名稱在原始 planets 中的位置，不存在為 -1"""
+    return index["order"].get(name, -1)
+
+
+def rank(index, name):
+    """名稱在排序後清單中的位置，不存在為 -1"""
+    return index["rank"].get(name, -1)
+
+
+def prefix(index, text, limit=None):
+    ordered = index["lex"]
+    lo = bisect_left(ordered, text)
+    hi = bisect_right(ordered, text + _MAX_CHAR, lo)
+    if limit is not None:
+        hi = min(hi, lo + limit)
+    return ordered[lo:hi]
+
+
+def between(index, low, high, limit=None):
+    """low <= 名稱 <= high 的星球 (依自然排序)"""
+    ordered = index["sorted"]
+    key = namesort.natural_key
+    lo = bisect_left(ordered, key(low), key=key)
+    hi = bisect_right(ordered, key(high), lo, key=key)
+    if limit is not None:
+        hi = min(hi, lo + limit)
+    return ordered[lo:hi]
@@ -0,0 +1,174 @@
+# namesort.py
+# 星球名稱的自然排序 (Planet_2 < Planet_10) + 就地 introsort
+#
+# introsort：
+#   - 三數取中選 pivot，三路切分 (大量重複名稱時不會退化)
+#   - 用明確的堆疊取代遞迴，先處理較短的一側，堆疊深度 O(log n)
+#   - 切分層數超過 2*log2(n) 時改用 heapsort，最差情況仍是 O(n log n)
+#   - 長度 <= 16 的區段最後用 insertion sort 收尾
+# 比較用的 key 事先算好一次放在 keys 陣列，與 arr 一起交換。
+# 名稱裡不應出現 '\x00'。
+
+import re
+
+SMALL = 16
+
+_DIGITS = re.compile(r'(\d+)')
+
+
+def natural_key(name):
+    r"""
+    把名稱編成一般字串比較就等於自然排序的 key：
+    每段數字換成 '\x00' + 位數 + 去掉前導零的數字，位數多的數字比較大，
+    '\x00' 比任何文字都小，所以 'ab' < 'ab1' < 'abc'。
+    最後接上原字串，讓 'a01' 與 'a1' 仍有固定先後 (全序)。
+    字串比較在 C 裡完成，比 tuple 逐項比較快得多。
+    """
+    parts = _DIGITS.split(name)
+    for i in range(1, len(parts), 2):
+        digits = parts[i].lstrip("0") or "0"
+        parts[i] = "\x00" + chr(len(digits)) + digits
+    parts.append("\x00\x00")
+    parts.append(name)
+    return "".join(parts)
+
+
+# ----------------------------
+# Helpers (都作用在 [lo, hi) 區段，arr 與 keys 同步交換)
+# ----------------------------
+
+def _insertion(arr, keys, lo, hi):
+    for i in range(lo + 1, hi):
+        k = keys[i]
+        x = arr[i]
+        j = i - 1
+        while j >= lo and keys[j] > k:
+            keys[j + 1] = keys[j]
+            arr[j + 1] = arr[j]
+            j -= 1
+        keys[j + 1] = k
+        arr[j + 1] = x
+
+
+def _sift_down(arr, keys, lo, root, end):
+    # 以 lo 為基準的 max-heap；end 為堆積大小
+    while True:
+        child = 2 * root + 1
+        if child >= end:
+            return
+        if child + 1 < end and keys[lo + child] < keys[lo + child + 1]:
+            child += 1
+        if keys[lo + root] >= keys[lo + child]:
+            return
+        a, b = lo + root, lo + child
+        keys[a], keys[b] = keys[b], keys[a]
+        arr[a], arr[b] = arr[b], arr[a]
+        root = child
+
+
+def _heapsort(arr, keys, lo, hi):
+    n = hi - lo
+    for root in range(n // 2 - 1, -1, -1):
+        _sift_down(arr, keys, lo, root, n)
+    for end in range(n - 1, 0, -1):
+        keys[lo], keys[lo + end] = keys[lo + end], keys[lo]
+        arr[lo], arr[lo + end] = arr[lo + end], arr[lo]
+        _sift_down(arr, keys, lo, 0, end)
+
+
+def _median_of_three(keys, lo, hi):
+    a, b, c = keys[lo], keys[(lo + hi) // 2], keys[hi - 1]
+    if a < b:
+        if b < c:
+            return b
+        return c if a < c else a
+    if a < c:
+        return a
+    return c if b < c else b
+
+
+def _swap_block(arr, keys, i, j, count):
+    for _ in range(count):
+        keys[i], keys[j] = keys[j], keys[i]
+        arr[i], arr[j] = arr[j], arr[i]
+        i += 1
+        j += 1
+
+
+def _partition3(arr, keys, lo, hi, pivot):
+    """
+    Bentley–McIlroy 三路切分：左右兩端往中間掃，只交換放錯邊的元素，
+    與 pivot 相等的先暫放兩端，最後再搬回中間。
+    回傳 (lt, gt)：[lo, lt) < pivot，[lt, gt) == pivot，[gt, hi) > pivot
+    """
+    a = b = lo            # [lo, a) == pivot，[a, b) < pivot
+    c = d = hi - 1        # (c, d] > pivot，(d, hi) == pivot
+    while True:
+        while b <= c:
+            k = keys[b]
+            if k < pivot:
+                b += 1
+            elif k == pivot:
+                keys[a], keys[b] = k, keys[a]
+                arr[a], arr[b] = arr[b], arr[a]
+                a += 1
+                b += 1
+            else:
+                break
+        while c >= b:
+            k = keys[c]
+            if k > pivot:
+                c -= 1
+            elif k == pivot:
+                keys[d], keys[c] = k, keys[d]
+                arr[d], arr[c] = arr[c], arr[d]
+                d -= 1
+                c -= 1
+            else:
+                break
+        if b > c:
+            break
+        keys[b], keys[c] = keys[c], keys[b]
+        arr[b], arr[c] = arr[c], arr[b]
+        b += 1
+        c -= 1
+
+    n = min(a - lo, b - a)
+    _swap_block(arr, keys, lo, b - n, n)
+    n = min(d - c, hi - 1 - d)
+    _swap_block(arr, keys, b, hi - n, n)
+    return lo + (b - a), hi - (d - c)
+
+
+# ----------------------------
+# Introsort
+# ----------------------------
+
+def introsort(arr, key=natural_key, keys=None):
+    """
+    就地排序 arr (預設為自然排序)。keys 可傳入已算好的 key 陣列，會與 arr 一起被排序。
+    """
+    n = len(arr)
+    if keys is None:
+        keys = [key(x) for x in arr]
+    if n < 2:
+        return arr
+    stack = [(0, n, 2 * n.bit_length())]
+    while stack:
+        lo, hi, depth = stack.pop()
+        while hi - lo > SMALL:
+            if depth == 0:
+                _heapsort(arr, keys, lo, hi)
+                break
+            depth -= 1
+            lt, gt = _partition3(arr, keys, lo, hi, _median_of_three(keys, lo, hi))
+            # 較長的一側放進堆疊，先繼續處理較短的一側
+            if lt - lo < hi - gt:
+                stack.append((gt, hi, depth))
+                hi = lt
+            else:
+                stack.append((lo, lt, depth))
+                lo = gt
+        else:
+            _insertion(arr, keys, lo, hi)
+    return arr
@@ -0,0 +1,98 @@
+# pathcache.py
+# 最短路徑樹的 LRU 快取
+#
+# key = (graph_version, source, metric)，metric 為 "fuel" (Dijkstra) 或 "hops" (BFS)。
+# 地圖重新載入或被編輯時 graph_version 會遞增，舊版本的樹自然不會再被命中，
+# 之後會依 LRU 順序被淘汰。快取以估計的位元組數為上限。
+
+import sys
+from collections import OrderedDict
+
+
+def new_cache(max_bytes=256 << 20, ghost_size=4096):
+    return {"entries": OrderedDict(), "bytes": 0, "max_bytes": max_bytes,
+            "ghosts": OrderedDict(), "ghost_size": ghost_size,
+            "hits": 0, "misses": 0, "evictions": 0}
+
+
+def estimate_size(*tables):
+    # dict 本身 + 每個值約一個 int/float 物件；key 是與圖共用的字串，不另外計算
+    return sum(sys.getsizeof(t) + 32 * len(t) for t in tables)
+
+
+def get(cache, version, source, metric):
+    key = (version, source, metric)
+    entries = cache["entries"]
+    if key in entries:
+        entries.move_to_end(key)
+        cache["hits"] += 1
+        return entries[key][0]
+    cache["misses"] += 1
+    return None
+
+
+def should_admit(cache, version, source, metric):
+    """
+    第二次被問到的起點才值得算整棵樹放進快取；第一次只記在 ghosts 名單裡。
+    """
+    key = (version, source, metric)
+    ghosts = cache["ghosts"]
+    if key in ghosts:
+        del ghosts[key]
+        return True
+    ghosts[key] = None
+    if len(ghosts) > cache["ghost_size"]:
+        ghosts.popitem(last=False)
+    return False
+
+
+def put(cache, version, source, metric, value, size=None):
+    if size is None:
+        size = estimate_size(*value)
+    if size > cache["max_bytes"]:
+        return False
+    key = (version, source, metric)
+    entries = cache["entries"]
+    if key in entries:
+        cache["bytes"] -= entries.pop(key)[1]
+    entries[key] = (value, size)
+    cache["bytes"] += size
+    while cache["bytes"] > cache["max_bytes"]:
+        _, (_, old_size) = entries.popitem(last=False)
+        cache["bytes"] -= old_size
+        cache["evictions"] += 1
+    return True
+
+
+def entries_for(cache, version, metric):
+    # [(source, value), ...]：某版本、某 metric 的所有樹（不影響 LRU 順序與計數）
+    return [(k[1], v[0]) for k, v in cache["entries"].items() if k[0] == version and k[2] == metric]
+
+
+def rekey(cache, old_version, new_version, metric):
+    # 樹已經就地修復成新版本的內容時，把它們搬到新版本的 key 下，保留 LRU 順序
+    entries = cache["entries"]
+    for key in [k for k in entries if k[0] == old_version and k[2] == metric]:
+        entries[(new_version, key[1], metric)] = entries.pop(key)
+
+
+def discard_stale(cache, version):
+    # 地圖換版本後，舊版本的樹不會再被命中，直接釋放
+    for key in [k for k in cache["entries"] if k[0] != version]:
+        cache["bytes"] -= cache["entries"].pop(key)[1]
+    for key in [k for k in cache["ghosts"] if k[0] != version]:
+        del cache["ghosts"][key]
+
+
+def clear(cache):
+    cache["entries"].clear()
+    cache["ghosts"].clear()
+    cache["bytes"] = 0
+
+
+def stats(cache):
+    lookups = cache["hits"] + cache["misses"]
+    return {"entries": len(cache["entries"]), "bytes": cache["bytes"],
+            "max_bytes": cache["max_bytes"], "hits": cache["hits"],
+            "misses": cache["misses"], "evictions": cache["evictions"],
+            "hit_rate": cache["hits"] / lookups if lookups else 0.0}
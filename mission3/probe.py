@@ -0,0 +1,74 @@
+# probe.py
+# 搜尋量測：記錄每次 bfs_path / dijkstra 呼叫的工作量，用來分辨「圖的形狀」還是「演算法」造成查詢變慢
+#
+# 每筆紀錄的欄位：
+#   settled    被取出並展開的星球數
+#   relaxed    檢查過的航道數
+#   pushes     放進 queue / heap 的次數 (Dijkstra 含 lazy deletion 的重複項)
+#   max_queue  queue / heap 的最大長度
+#   seconds    wall time
+#
+# 預設關閉；關閉時 main.bfs_path / main.dijkstra 只多一次 enabled 判斷，
+# 計數器本身只在每個星球更新一次，不在每條航道上累加。
+
+import json
+import sys
+from collections import deque
+
+MAX_RECORDS = 100000
+FIELDS = ("settled", "relaxed", "pushes", "max_queue")
+
+enabled = False
+records = deque(maxlen=MAX_RECORDS)
+
+
+def enable(on=True):
+    global enabled
+    enabled = on
+
+
+def reset():
+    records.clear()
+
+
+def record(algorithm, start, goal, stats, seconds):
+    records.append({"algorithm": algorithm, "start": start, "goal": goal,
+                    **{k: stats.get(k, 0) for k in FIELDS}, "seconds": seconds})
+
+
+def summary():
+    """依演算法彙總：{algorithm: {"calls", "seconds", 各欄位的 mean / max}}"""
+    result = {}
+    for r in records:
+        s = result.setdefault(r["algorithm"], {"calls": 0, "seconds": 0.0,
+                                               **{f"{k}_max": 0 for k in FIELDS},
+                                               **{f"{k}_mean": 0.0 for k in FIELDS}})
+        s["calls"] += 1
+        s["seconds"] += r["seconds"]
+        for k in FIELDS:
+            s[f"{k}_mean"] += r[k]
+            s[f"{k}_max"] = max(s[f"{k}_max"], r[k])
+    for s in result.values():
+        for k in FIELDS:
+            s[f"{k}_mean"] /= s["calls"]
+    return result
+
+
+def print_summary(out=None):
+    # out 在呼叫時才決定 (預設為當下的 sys.stdout)，之後重新導向 stdout 也會生效
+    if out is None:
+        out = sys.stdout
+    rows = summary()
+    if not rows:
+        print("尚無量測紀錄", file=out)
+        return
+    print(f"{'algorithm':>10} {'calls':>7} {'total (s)':>10} "
+          + " ".join(f"{k + ' avg/max':>22}" for k in FIELDS), file=out)
+    for name, s in rows.items():
+        cells = " ".join(f"{s[k + '_mean']:>12.1f}/{s[k + '_max']:<9}" for k in FIELDS)
+        print(f"{name:>10} {s['calls']:>7} {s['seconds']:>10.4f} {cells}", file=out)
+
+
+def write_jsonl(out):
+    for r in records:
+        out.write(json.dumps(r, ensure_ascii=False) + "\n")
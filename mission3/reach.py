@@ -0,0 +1,269 @@
+# reach.py
+# 強連通元件 (SCC) + 縮點 DAG 的可達性索引：不可能抵達的查詢直接拒絕，不用把可達範圍全部走完
+#
+#   comp        每個星球所屬 SCC 的編號。Tarjan 依「反拓撲順序」編號：
+#               縮點 DAG 上 a -> b 必定 a > b，所以 comp[起點] < comp[終點] 時一定到不了 (O(1))
+#   lo / post   GRAIL 風格的區間標籤：在 DAG 上做 d 次隨機順序的 DFS，
+#               post 為後序編號、lo 為子孫中最小的 post。a 可達 b 時 b 的區間一定包含在 a 的區間內，
+#               任一組區間不包含就能 O(1) 拒絕
+#   possible    只用編號與標籤的 O(1) 判斷
+#   reachable   標籤無法判定時，在 DAG 上做 DFS，並用同樣的條件剪枝，結果是精確的
+#   relevant    位於某條 起點 -> 終點 路徑上的 SCC (bytearray 遮罩)，讓搜尋只在這些星球裡進行
+#
+# 新增航道可能合併 SCC，索引必須重建；刪除或修改航道只會讓可達範圍變小或不變，舊索引仍不會誤判拒絕。
+
+import random
+from array import array
+
+import csr
+
+
+# ----------------------------
+# Build
+# ----------------------------
+
+def _tarjan(n, offsets, targets):
+    # 非遞迴 Tarjan；回傳 (comp array, SCC 數)
+    order = array('i', [-1]) * n
+    low = array('i', [0]) * n
+    on_stack = bytearray(n)
+    comp = array('i', [-1]) * n
+    stack = []
+    counter = 0
+    count = 0
+
+    for root in range(n):
+        if order[root] != -1:
+            continue
+        order[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        work = [(root, offsets[root])]
+        while work:
+            u, k = work[-1]
+            end = offsets[u + 1]
+            while k < end:
+                v = targets[k]
+                k += 1
+                if order[v] == -1:
+                    work[-1] = (u, k)
+                    order[v] = low[v] = counter
+                    counter += 1
+                    stack.append(v)
+                    on_stack[v] = 1
+                    work.append((v, offsets[v]))
+                    break
+                if on_stack[v] and order[v] < low[u]:
+                    low[u] = order[v]
+            else:
+                work.pop()
+                if work:
+                    p = work[-1][0]
+                    if low[u] < low[p]:
+                        low[p] = low[u]
+                if low[u] == order[u]:
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = 0
+                        comp[w] = count
+                        if w == u:
+                            break
+                    count += 1
+    return comp, count
+
+
+def _condense(g, comp, count):
+    # 縮點 DAG 的 CSR (offsets, targets)，重複的 SCC 間邊只保留一條
+    offsets = g["offsets"]
+    targets = g["targets"]
+    pairs = set()
+    for u in range(len(g["names"])):
+        cu = comp[u]
+        for k in range(offsets[u], offsets[u + 1]):
+            cv = comp[targets[k]]
+            if cv != cu:
+                pairs.add(cu * count + cv)
+    dag_offsets = array('i', [0]) * (count + 1)
+    for p in pairs:
+        dag_offsets[p // count + 1] += 1
+    for c in range(count):
+        dag_offsets[c + 1] += dag_offsets[c]
+    fill = array('i', dag_offsets)
+    dag_targets = array('i', [0]) * len(pairs)
+    for p in pairs:
+        c = p // count
+        dag_targets[fill[c]] = p % count
+        fill[c] += 1
+    return dag_offsets, dag_targets
+
+
+def _label(count, dag_offsets, dag_targets, rng):
+    # 隨機順序的 DFS；回傳 (lo, post)
+    post = array('i', [-1]) * count
+    lo = array('i', [0]) * count
+    roots = list(range(count))
+    rng.shuffle(roots)
+    rank = 0
+    for root in roots:
+        if post[root] != -1:
+            continue
+        post[root] = -2  # 走訪中
+        lo[root] = count
+        children = list(dag_targets[dag_offsets[root]:dag_offsets[root + 1]])
+        rng.shuffle(children)
+        work = [(root, children)]
+        while work:
+            c, children = work[-1]
+            if children:
+                d = children.pop()
+                if post[d] == -1:
+                    post[d] = -2
+                    lo[d] = count
+                    grand = list(dag_targets[dag_offsets[d]:dag_offsets[d + 1]])
+                    rng.shuffle(grand)
+                    work.append((d, grand))
+                elif lo[d] < lo[c]:
+                    lo[c] = lo[d]
+                continue
+            work.pop()
+            post[c] = rank
+            if rank < lo[c]:
+                lo[c] = rank
+            rank += 1
+            if work:
+                p = work[-1][0]
+                if lo[c] < lo[p]:
+                    lo[p] = lo[c]
+    return lo, post
+
+
+def build(graph, labels=2, seed=0):
+    g = csr.from_graph(graph)
+    comp, count = _tarjan(len(g["names"]), g["offsets"], g["targets"])
+    dag_offsets, dag_targets = _condense(g, comp, count)
+    rng = random.Random(seed)
+    lo, post = zip(*(_label(count, dag_offsets, dag_targets, rng) for _ in range(labels))) \
+        if labels else ((), ())
+    sizes = array('i', [0]) * count
+    for c in comp:
+        sizes[c] += 1
+    if csr.is_csr(graph):
+        comp_of = comp
+        index = graph["index"]
+    else:
+        # dict-of-lists 的圖直接以名稱查 SCC，不保留臨時的 CSR
+        comp_of = {name: comp[i] for i, name in enumerate(g["names"])}
+        index = None
+    return {"comp": comp_of, "index": index, "count": count, "sizes": sizes,
+            "dag_offsets": dag_offsets, "dag_targets": dag_targets,
+            "lo": list(lo), "post": list(post)}
+
+
+# ----------------------------
+# Queries
+# ----------------------------
+
+def component(reach, name):
+    """星球所屬 SCC 編號，不存在為 -1"""
+    if reach["index"] is None:
+        return reach["comp"].get(name, -1)
+    i = reach["index"].get(name, -1)
+    return reach["comp"][i] if i != -1 else -1
+
+
+def _may_reach(reach, a, b):
+    # 只看編號與區間標籤：False 表示一定到不了，True 表示無法排除
+    if a < b:
+        return False
+    for lo, post in zip(reach["lo"], reach["post"]):
+        if lo[b] < lo[a] or post[b] > post[a]:
+            return False
+    return True
+
+
+def possible(reach, start, goal):
+    """
+    O(1) 判斷：False 表示一定到不了；True 表示無法排除 (包含索引裡沒有的星球)。
+    """
+    a = component(reach, start)
+    b = component(reach, goal)
+    if a == -1 or b == -1:
+        return True
+    return a == b or _may_reach(reach, a, b)
+
+
+def reachable(reach, start, goal):
+    # 精確判斷；標籤無法排除時才在縮點 DAG 上搜尋
+    a = component(reach, start)
+    b = component(reach, goal)
+    if a == -1 or b == -1:
+        return False
+    if a == b:
+        return True
+    if not _may_reach(reach, a, b):
+        return False
+    offsets = reach["dag_offsets"]
+    targets = reach["dag_targets"]
+    seen = {a}
+    stack = [a]
+    while stack:
+        c = stack.pop()
+        for k in range(offsets[c], offsets[c + 1]):
+            d = targets[k]
+            if d == b:
+                return True
+            if d not in seen and _may_reach(reach, d, b):
+                seen.add(d)
+                stack.append(d)
+    return False
+
+
+def relevant(reach, start, goal):
+    """
+    回傳 bytearray 遮罩 (以 SCC 編號為索引)，1 表示該 SCC 位於某條 start -> goal 的路徑上；
+    到不了時回傳 None。
+    """
+    a = component(reach, start)
+    b = component(reach, goal)
+    if a == -1 or b == -1 or not _may_reach(reach, a, b):
+        return None
+    mask = bytearray(reach["count"])
+    mask[b] = 1
+    if a == b:
+        return mask
+    offsets = reach["dag_offsets"]
+    targets = reach["dag_targets"]
+    # 後序 DFS：子節點都處理完後，只要有一個子節點相關，自己就相關
+    seen = {a, b}
+    work = [(a, offsets[a])]
+    while work:
+        c, k = work[-1]
+        if k < offsets[c + 1]:
+            work[-1] = (c, k + 1)
+            d = targets[k]
+            if d not in seen and _may_reach(reach, d, b):
+                seen.add(d)
+                work.append((d, offsets[d]))
+            continue
+        work.pop()
+        if not mask[c]:
+            for k in range(offsets[c], offsets[c + 1]):
+                if mask[targets[k]]:
+                    mask[c] = 1
+                    break
+    return mask if mask[a] else None
+
+
+def blocked(reach, mask):
+    """遮罩外的星球 (dict 圖回傳名稱，CSR 回傳 ID)"""
+    comp = reach["comp"]
+    if reach["index"] is None:
+        return [name for name, c in comp.items() if not mask[c]]
+    return [i for i, c in enumerate(comp) if not mask[c]]
+
+
+def stats(reach):
+    sizes = reach["sizes"]
+    return {"components": reach["count"], "largest": max(sizes) if sizes else 0,
+            "singletons": sum(1 for s in sizes if s == 1), "dag_edges": len(reach["dag_targets"])}
@@ -0,0 +1,234 @@
+# server.py
+# 本機 asyncio HTTP 查詢伺服器：地圖只載入一次，多個客戶端同時查詢
+#
+#   GET /bfs?start=Planet_0&goal=Planet_5        最少跳躍 (雙向 BFS)
+#   GET /dijkstra?start=Planet_0&goal=Planet_5   最低燃料
+#   GET /search?name=Planet_5                    星球是否存在
+#   GET /summary                                 星球 / 航道數
+#   GET /stats                                   各端點請求數與延遲百分位數 (ms)，未知路徑合併為 "404"，
+#                                                無法解析的請求為 "400"
+#
+# BFS / Dijkstra 交給 process pool 執行，event loop 不會被卡住。
+# 地圖以 CSR 載入並寫成 .snap 快照，worker 以 mmap 開同一份快照，航道陣列共用 page cache。
+# 雙向 BFS 需要的反向 CSR 在各 worker 第一次收到 /bfs 時才建立 (每個 worker 一份)。
+#
+# 執行方式：python server.py space_map.json [--port 8765] [--workers 4]
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from urllib.parse import parse_qs, urlsplit
+
+import csr
+import main
+
+LATENCY_WINDOW = 10000
+MAX_BODY = 1 << 20          # 請求本文上限；所有端點都只用 GET，本文讀掉後丟棄
+ROUTES = ("/bfs", "/dijkstra", "/search", "/summary", "/stats")
+
+_graph = None
+_reverse = None
+_reverse_lock = threading.Lock()
+
+
+# ----------------------------
+# Worker side
+# ----------------------------
+
+def _worker_init(map_path):
+    global _graph, _reverse
+    _, _graph = main.load_space_map(map_path, backend="csr")
+    _reverse = None
+
+
+def _reverse_graph():
+    # 第一次雙向查詢時才建立；--workers 0 時多個 thread 共用，以 lock 避免重複建立
+    global _reverse
+    if _reverse is None:
+        with _reverse_lock:
+            if _reverse is None:
+                _reverse = csr.reverse(_graph)
+    return _reverse
+
+
+def _worker_bfs(start, goal):
+    path = main.bfs_path(_graph, start, goal, reverse=_reverse_graph())
+    return {"start": start, "goal": goal,
+            "hops": len(path) - 1 if path else None, "path": path}
+
+
+def _worker_dijkstra(start, goal):
+    index = _graph["index"]
+    result = {"start": start, "goal": goal, "fuel": None, "path": []}
+    if start not in index or goal not in index:
+        return result
+    t = index[goal]
+    dist, parent = csr.dijkstra_ids(_graph, index[start], t)
+    if dist[t] != float('inf'):
+        names = _graph["names"]
+        path = []
+        cur = t
+        while cur != -1:
+            path.append(names[cur])
+            cur = parent[cur]
+        path.reverse()
+        result["fuel"] = dist[t]
+        result["path"] = path
+    return result
+
+
+# ----------------------------
+# Server side
+# ----------------------------
+
+def new_state(map_path, workers):
+    _worker_init(map_path)
+    return {"map": map_path, "graph": _graph,
+            "pool": ProcessPoolExecutor(max_workers=workers, initializer=_worker_init,
+                                        initargs=(map_path,)) if workers > 0 else None,
+            "latency": {}, "count": {}}
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    k = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def latency_stats(state):
+    result = {}
+    for endpoint, samples in state["latency"].items():
+        values = sorted(samples)
+        result[endpoint] = {"count": state["count"][endpoint],
+                            **{f"p{q}": _percentile(values, q) for q in (50, 90, 99)},
+                            "max": values[-1] if values else None}
+    return result
+
+
+async def _offload(state, fn, *args):
+    if state["pool"] is None:
+        return await asyncio.to_thread(fn, *args)
+    return await asyncio.get_running_loop().run_in_executor(state["pool"], fn, *args)
+
+
+async def handle_request(state, path, query):
+    g = state["graph"]
+    if path == "/bfs" or path == "/dijkstra":
+        start = query.get("start", [""])[0]
+        goal = query.get("goal", [""])[0]
+        if not start or not goal:
+            return 400, {"error": "需要 start 與 goal 參數"}
+        if not csr.has_planet(g, start) or not csr.has_planet(g, goal):
+            return 404, {"error": "節點不存在", "start": start, "goal": goal}
+        fn = _worker_bfs if path == "/bfs" else _worker_dijkstra
+        return 200, await _offload(state, fn, start, goal)
+    if path == "/search":
+        name = query.get("name", [""])[0]
+        return 200, {"name": name, "found": csr.has_planet(g, name),
+                     "index": g["index"].get(name, -1)}
+    if path == "/summary":
+        return 200, {"map": state["map"], "planets": csr.num_planets(g), "routes": csr.num_routes(g)}
+    if path == "/stats":
+        return 200, latency_stats(state)
+    return 404, {"error": f"未知的路徑：{path}"}
+
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            500: "Internal Server Error"}
+
+
+async def serve_client(state, reader, writer):
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                key, _, value = line.decode("latin-1").partition(":")
+                headers[key.strip().lower()] = value.strip()
+
+            t0 = perf_counter()
+            keep_alive = headers.get("connection", "").lower() != "close"
+            parts = request_line.decode("latin-1").split()
+            length = headers.get("content-length", "0")
+            if len(parts) < 2 or not length.isdigit() or int(length) > MAX_BODY:
+                # 無法判斷這個請求在哪裡結束，回覆 400 後關閉連線
+                status, body = 400, {"error": "無法解析的請求"}
+                endpoint = "400"
+                keep_alive = False
+            else:
+                # 讀掉請求本文，keep-alive 的下一個請求才不會從本文中間開始解析
+                await reader.readexactly(int(length))
+                method, target = parts[0], parts[1]
+                url = urlsplit(target)
+                # 以端點分組；任意的未知路徑都記在同一組，統計表的大小固定
+                endpoint = url.path if url.path in ROUTES else "404"
+                if method != "GET":
+                    status, body = 405, {"error": "只支援 GET"}
+                else:
+                    try:
+                        status, body = await handle_request(state, url.path, parse_qs(url.query))
+                    except Exception as e:  # 單一請求失敗不該讓伺服器停掉
+                        status, body = 500, {"error": str(e)}
+
+            payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+                + payload)
+            await writer.drain()
+
+            elapsed = (perf_counter() - t0) * 1000
+            state["latency"].setdefault(endpoint, deque(maxlen=LATENCY_WINDOW)).append(elapsed)
+            state["count"][endpoint] = state["count"].get(endpoint, 0) + 1
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def run_server(map_path, host="127.0.0.1", port=8765, workers=None):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    state = new_state(map_path, workers)
+    server = await asyncio.start_server(
+        lambda r, w: serve_client(state, r, w), host, port)
+    print(f"Serving {map_path} on http://{host}:{port} ({workers} workers)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if state["pool"] is not None:
+            state["pool"].shutdown(cancel_futures=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="本機太空航道查詢伺服器")
+    parser.add_argument("map", help="地圖 JSON 檔")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="process pool 大小，0 表示在 thread 中執行，預設為 CPU 數")
+    args = parser.parse_args()
+    if not os.path.exists(args.map):
+        print(f"找不到地圖檔：{args.map}", file=sys.stderr)
+        sys.exit(1)
+    try:
+        asyncio.run(run_server(args.map, args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
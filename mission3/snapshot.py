@@ -0,0 +1,129 @@
+# snapshot.py
+# 二進位快照：把 CSR 圖存成 <map>.snap，下次直接 mmap 載入，不必重新解析 JSON
+#
+# 檔案格式 (version 1，little/big endian 依寫入的機器而定，header 內有記錄)：
+#   header        struct HEADER
+#   name_offsets  uint32 * (num_planets + 1)   每個名稱在 name_blob 的起訖位置
+#   name_blob     UTF-8 bytes，補齊到 8 的倍數
+#   offsets       int32 * (num_planets + 1)
+#   targets       int32 * num_routes
+#   weights       int32 * num_routes
+# content_hash 是原始 JSON 檔的 blake2b (有變更記錄時為 changelog.digest)；JSON 或記錄改變後快照自動失效。
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+MAGIC = b"SPMAPSNP"
+VERSION = 1
+HEADER = struct.Struct("<8sHB5xQ32sQQQ")
+_BYTEORDER = {"little": 0, "big": 1}[sys.byteorder]
+
+
+def snapshot_path(filename):
+    return os.path.splitext(filename)[0] + ".snap"
+
+
+def content_hash(filename, chunk_size=1 << 20):
+    h = hashlib.blake2b(digest_size=32)
+    with open(filename, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.digest()
+
+
+def names_digest(names):
+    # 星球名稱順序的雜湊，用來確認衍生索引的整數 ID 與目前的圖一致
+    h = hashlib.blake2b(digest_size=32)
+    for name in names:
+        h.update(name.encode("utf-8"))
+        h.update(b"\n")
+    return h.digest()
+
+
+def _pad(n):
+    return (-n) % 8
+
+
+# ----------------------------
+# Write
+# ----------------------------
+
+def save(graph, filename, digest=None):
+    """把 CSR 圖寫成 filename 對應的 .snap；digest 為 JSON 的 content_hash (或 changelog.digest)"""
+    if digest is None:
+        digest = content_hash(filename)
+    path = snapshot_path(filename)
+    names = graph["names"]
+
+    name_offsets = array('I', [0])
+    blob = bytearray()
+    for name in names:
+        blob += name.encode("utf-8")
+        name_offsets.append(len(blob))
+    blob += bytes(_pad(len(blob)))
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, _BYTEORDER, os.path.getsize(filename),
+                            digest, len(names), len(graph["targets"]), len(blob)))
+        f.write(name_offsets.tobytes())
+        f.write(bytes(_pad(len(name_offsets) * 4)))
+        f.write(blob)
+        for key in ("offsets", "targets", "weights"):
+            f.write(graph[key])
+    os.replace(tmp, path)
+    return path
+
+
+# ----------------------------
+# Load
+# ----------------------------
+
+def load(filename, digest=None):
+    """
+    快照存在且與 JSON 內容相符時，回傳 mmap 載入的 CSR 圖；否則回傳 None。
+    digest 預設為 JSON 的 content_hash (有變更記錄時由 changelog.digest 提供)。
+    offsets / targets / weights 是直接指向 mmap 的 memoryview，不會複製。
+    """
+    path = snapshot_path(filename)
+    if not os.path.exists(path) or not os.path.exists(filename):
+        return None
+
+    with open(path, "rb") as f:
+        head = f.read(HEADER.size)
+        if len(head) < HEADER.size:
+            return None
+        magic, version, byteorder, json_size, saved, n, m, blob_len = HEADER.unpack(head)
+        if magic != MAGIC or version != VERSION or byteorder != _BYTEORDER:
+            return None
+        if json_size != os.path.getsize(filename):
+            return None
+        if saved != (digest if digest is not None else content_hash(filename)):
+            return None
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    view = memoryview(mm)
+    pos = HEADER.size
+    name_offsets = view[pos:pos + 4 * (n + 1)].cast('I')
+    pos += 4 * (n + 1)
+    pos += _pad(pos)
+    blob = bytes(view[pos:pos + blob_len])
+    pos += blob_len
+    names = [blob[name_offsets[i]:name_offsets[i + 1]].decode("utf-8") for i in range(n)]
+    name_offsets.release()
+
+    offsets = view[pos:pos + 4 * (n + 1)].cast('i')
+    pos += 4 * (n + 1)
+    targets = view[pos:pos + 4 * m].cast('i')
+    pos += 4 * m
+    weights = view[pos:pos + 4 * m].cast('i')
+
+    return {"kind": "csr", "names": names, "index": {p: i for i, p in enumerate(names)},
+            "offsets": offsets, "targets": targets, "weights": weights, "mmap": mm}
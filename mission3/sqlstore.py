@@ -0,0 +1,388 @@
+# sqlstore.py
+# 存在磁碟上的 SQLite 圖 <map>.db：給放不進記憶體的大地圖用，搜尋時只讀需要的鄰接表
+#
+# 資料表：
+#   planets (id INTEGER PRIMARY KEY, name TEXT UNIQUE)
+#   routes  (src, dst, fuel)，索引 routes_out (src, dst, fuel) 與 routes_in (dst, src, fuel)
+#           兩個都是 covering index，出邊 / 入邊查詢只讀索引頁，不必回表
+#   meta    (key, value)：digest (changelog.digest，JSON + 變更記錄)、planets、routes
+# 匯入：以 streamjson 逐筆讀 JSON (已套用 <map>.log)，航道先放進 TEMP 暫存表，最後用 SQL join 換成 ID，
+#       名稱 -> ID 的對照不放在 Python 記憶體裡。
+# 快取：SQLite 自己的 page cache (PRAGMA cache_size) + 這裡的鄰居 LRU，以快取的航道數為上限。
+#       BFS 每一層的鄰居以 IN (...) 一次查詢，Dijkstra 逐點查詢。
+#
+# 星球在搜尋中以整數 ID 表示，只有回傳結果時才換回名稱。
+
+import heapq
+import os
+import sqlite3
+from collections import OrderedDict
+
+import changelog
+import streamjson
+
+VERSION = 1
+CACHE_EDGES = 1 << 18           # 鄰居 LRU 最多保留的航道數 (每條約 100 bytes)
+PAGE_CACHE_MB = 64              # SQLite page cache
+IMPORT_BATCH = 50000
+_IN_CHUNK = 500                 # IN (...) 每次最多幾個 ID
+
+_SQL = {
+    "out": "SELECT src, dst, fuel FROM routes WHERE src IN ({}) ORDER BY src",
+    "in": "SELECT dst, src, fuel FROM routes WHERE dst IN ({}) ORDER BY dst",
+}
+
+
+def db_path(filename):
+    return os.path.splitext(filename)[0] + ".db"
+
+
+def is_store(graph):
+    return isinstance(graph, dict) and graph.get("kind") == "sqlite"
+
+
+# ----------------------------
+# Import
+# ----------------------------
+
+def import_map(filename, path=None, batch=IMPORT_BATCH, echo=print):
+    """把 filename (含 <map>.log 的變更) 匯入成 SQLite 資料庫，回傳資料庫路徑"""
+    path = path or db_path(filename)
+    digest = changelog.digest(filename)
+    tmp = path + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.executescript("""
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            CREATE TABLE planets (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+            CREATE TEMP TABLE raw (src TEXT NOT NULL, dst TEXT NOT NULL, fuel INTEGER NOT NULL);
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        """)
+        planets = []
+        routes = []
+        events = changelog.fold(streamjson.iter_space_map(filename), changelog.read(filename))
+        for kind, item in events:
+            if kind == "planet":
+                planets.append((item,))
+                if len(planets) >= batch:
+                    conn.executemany("INSERT OR IGNORE INTO planets (name) VALUES (?)", planets)
+                    planets = []
+            else:
+                routes.append(item)
+                if len(routes) >= batch:
+                    conn.executemany("INSERT INTO raw VALUES (?, ?, ?)", routes)
+                    routes = []
+        conn.executemany("INSERT OR IGNORE INTO planets (name) VALUES (?)", planets)
+        conn.executemany("INSERT INTO raw VALUES (?, ?, ?)", routes)
+        # 只出現在航道裡的星球排在宣告過的星球之後 (與 csr.add_route 相同)
+        conn.executescript("""
+            INSERT OR IGNORE INTO planets (name) SELECT src FROM raw ORDER BY rowid;
+            INSERT OR IGNORE INTO planets (name) SELECT dst FROM raw ORDER BY rowid;
+            CREATE TABLE routes (src INTEGER NOT NULL, dst INTEGER NOT NULL, fuel INTEGER NOT NULL);
+            INSERT INTO routes (src, dst, fuel)
+                SELECT a.id, b.id, r.fuel FROM raw r
+                JOIN planets a ON a.name = r.src JOIN planets b ON b.name = r.dst ORDER BY r.rowid;
+            DROP TABLE raw;
+            CREATE INDEX routes_out ON routes (src, dst, fuel);
+            CREATE INDEX routes_in ON routes (dst, src, fuel);
+        """)
+        n = conn.execute("SELECT COUNT(*) FROM planets").fetchone()[0]
+        m = conn.execute("SELECT COUNT(*) FROM routes").fetchone()[0]
+        conn.executemany("INSERT INTO meta VALUES (?, ?)",
+                         [("version", str(VERSION)), ("digest", digest.hex()),
+                          ("planets", str(n)), ("routes", str(m))])
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp, path)
+    echo(f"已匯入 {n} planets, {m} routes -> {path}")
+    return path
+
+
+# ----------------------------
+# Open / close
+# ----------------------------
+
+def _meta(conn):
+    try:
+        return dict(conn.execute("SELECT key, value FROM meta"))
+    except sqlite3.DatabaseError:
+        return {}
+
+
+def open_store(filename, cache_edges=CACHE_EDGES, page_cache_mb=PAGE_CACHE_MB, echo=print):
+    """
+    開啟 filename 對應的 <map>.db；不存在或與 JSON + 變更記錄不符時先重新匯入。
+    回傳 {"kind": "sqlite", ...}，可直接交給 main.bfs_path / main.dijkstra。
+    """
+    path = db_path(filename)
+    digest = changelog.digest(filename).hex()
+    meta = {}
+    if os.path.exists(path):
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        meta = _meta(conn)
+        conn.close()
+    if meta.get("version") != str(VERSION) or meta.get("digest") != digest:
+        echo(f"建立 SQLite 圖資料庫 {path}...")
+        import_map(filename, path, echo=echo)
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    conn.execute(f"PRAGMA cache_size = {-page_cache_mb * 1024}")
+    conn.execute("PRAGMA mmap_size = 268435456")
+    meta = _meta(conn)
+    return {"kind": "sqlite", "path": path, "conn": conn,
+            "planets": int(meta["planets"]), "routes": int(meta["routes"]),
+            "cache": OrderedDict(), "cached_edges": 0, "max_edges": cache_edges,
+            "hits": 0, "misses": 0, "evictions": 0}
+
+
+def close(store):
+    store["conn"].close()
+
+
+def num_planets(store):
+    return store["planets"]
+
+
+def num_routes(store):
+    return store["routes"]
+
+
+def cache_stats(store):
+    total = store["hits"] + store["misses"]
+    return {"entries": len(store["cache"]), "edges": store["cached_edges"], "max_edges": store["max_edges"],
+            "hits": store["hits"], "misses": store["misses"], "evictions": store["evictions"],
+            "hit_rate": store["hits"] / total if total else 0.0}
+
+
+# ----------------------------
+# Names <-> IDs
+# ----------------------------
+
+def planet_id(store, name):
+    row = store["conn"].execute("SELECT id FROM planets WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else -1
+
+
+def has_planet(store, name):
+    return planet_id(store, name) != -1
+
+
+def names_of(store, ids):
+    """{ID: 名稱}，分批以 IN (...) 查詢"""
+    ids = list(ids)
+    names = {}
+    conn = store["conn"]
+    for i in range(0, len(ids), _IN_CHUNK):
+        chunk = ids[i:i + _IN_CHUNK]
+        sql = f"SELECT id, name FROM planets WHERE id IN ({','.join('?' * len(chunk))})"
+        names.update(conn.execute(sql, chunk))
+    return names
+
+
+def iter_planets(store):
+    # 依 ID 順序逐一產生星球名稱，不會一次讀進記憶體
+    for (name,) in store["conn"].execute("SELECT name FROM planets ORDER BY id"):
+        yield name
+
+
+# ----------------------------
+# Neighbor cache
+# ----------------------------
+
+def _remember(store, key, edges):
+    cache = store["cache"]
+    cache[key] = edges
+    store["cached_edges"] += len(edges) + 1
+    while store["cached_edges"] > store["max_edges"] and len(cache) > 1:
+        _, old = cache.popitem(last=False)
+        store["cached_edges"] -= len(old) + 1
+        store["evictions"] += 1
+
+
+def neighbors_many(store, ids, side="out"):
+    """
+    {ID: ((鄰居 ID, 燃料), ...)}；side="in" 時為入邊 (鄰居為前一站)。
+    快取沒有的 ID 合併成 IN (...) 查詢。
+    """
+    cache = store["cache"]
+    result = {}
+    missing = []
+    for u in ids:
+        key = (side, u)
+        if key in cache:
+            cache.move_to_end(key)
+            result[u] = cache[key]
+        else:
+            missing.append(u)
+    store["hits"] += len(result)
+    store["misses"] += len(missing)
+    conn = store["conn"]
+    for i in range(0, len(missing), _IN_CHUNK):
+        chunk = missing[i:i + _IN_CHUNK]
+        found = {u: [] for u in chunk}
+        for u, v, w in conn.execute(_SQL[side].format(",".join("?" * len(chunk))), chunk):
+            found[u].append((v, w))
+        for u, edges in found.items():
+            edges = tuple(edges)
+            result[u] = edges
+            _remember(store, (side, u), edges)
+    return result
+
+
+def neighbors(store, u, side="out"):
+    key = (side, u)
+    cache = store["cache"]
+    if key in cache:
+        cache.move_to_end(key)
+        store["hits"] += 1
+        return cache[key]
+    return neighbors_many(store, (u,), side)[u]
+
+
+def routes_from(store, name):
+    # [(終點名稱, 燃料), ...]
+    u = planet_id(store, name)
+    if u == -1:
+        return []
+    edges = neighbors(store, u)
+    names = names_of(store, {v for v, _ in edges})
+    return [(names[v], w) for v, w in edges]
+
+
+# ----------------------------
+# Search
+# ----------------------------
+
+def _path(parent, t):
+    path = [t]
+    while parent[path[-1]] != -1:
+        path.append(parent[path[-1]])
+    path.reverse()
+    return path
+
+
+def _expand_level(store, front, side, dist, link, other_dist):
+    # 展開一整層 (鄰居一次查詢)；回傳下一層、與另一側相遇且總長度最短的節點、看過的航道數
+    nxt = []
+    meet = -1
+    best = -1
+    relaxed = 0
+    edges = neighbors_many(store, front, side)
+    for u in front:
+        du = dist[u] + 1
+        relaxed += len(edges[u])
+        for v, _ in edges[u]:
+            if v not in dist:
+                dist[v] = du
+                link[v] = u
+                nxt.append(v)
+                if v in other_dist and (best == -1 or du + other_dist[v] < best):
+                    best = du + other_dist[v]
+                    meet = v
+    return nxt, meet, relaxed
+
+
+def bfs_path(store, start, goal, reverse=None, stats=None):
+    """
+    最少跳躍路徑 (星球名稱 list)，到不了時為 []。
+    reverse 不為 None 時從兩端同時展開 (入邊由 routes_in 索引提供，不需要另外的反向圖)。
+    stats 為 dict 時寫入 settled / relaxed / pushes / max_queue (見 probe.py)。
+    """
+    s = planet_id(store, start)
+    t = planet_id(store, goal)
+    if s == -1 or t == -1:
+        return []
+    dist_f = {s: 0}
+    dist_b = {t: 0} if reverse is not None else {}
+    parent = {s: -1}
+    child = {t: -1}
+    front_f = [s]
+    front_b = [t] if reverse is not None else []
+    meet = s if s == t else -1
+    settled = relaxed = peak = 0
+    pushes = 1 + len(front_b)
+
+    while meet == -1 and front_f and (front_b or reverse is None):
+        forward = reverse is None or len(front_f) <= len(front_b)
+        front = front_f if forward else front_b
+        settled += len(front)
+        peak = max(peak, len(front_f) + len(front_b))
+        if forward:
+            front_f, meet, count = _expand_level(store, front, "out", dist_f, parent, dist_b)
+            if reverse is None and t in dist_f:
+                meet = t
+            pushes += len(front_f)
+        else:
+            front_b, meet, count = _expand_level(store, front, "in", dist_b, child, dist_f)
+            pushes += len(front_b)
+        relaxed += count
+
+    if stats is not None:
+        stats.update(settled=settled, relaxed=relaxed, pushes=pushes, max_queue=peak)
+    if meet == -1:
+        return []
+    path = _path(parent, meet)
+    cur = child.get(meet, -1)
+    while cur != -1:
+        path.append(cur)
+        cur = child[cur]
+    names = names_of(store, path)
+    return [names[v] for v in path]
+
+
+def dijkstra_ids(store, s, targets=(), stats=None, skip=()):
+    """
+    從 ID s 出發的 Dijkstra；targets 全部 settle 後提早結束 (空的時候跑完整個可達範圍)。
+    回傳 (dist, parent) 兩個 dict，只含走到過的星球。
+    """
+    dist = {v: -1 for v in skip}
+    dist[s] = 0
+    parent = {s: -1}
+    left = set(targets)
+    heap = [(0, s)]
+    settled = relaxed = stale = peak = 0
+    while heap:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            stale += 1
+            continue
+        settled += 1
+        if left:
+            left.discard(u)
+            if not left:
+                break
+        edges = neighbors(store, u)
+        relaxed += len(edges)
+        for v, w in edges:
+            alt = d + w
+            if alt < dist.get(v, float('inf')):
+                dist[v] = alt
+                parent[v] = u
+                heapq.heappush(heap, (alt, v))
+        if len(heap) > peak:
+            peak = len(heap)
+    if stats is not None:
+        stats.update(settled=settled, relaxed=relaxed, pushes=settled + stale + len(heap),
+                     max_queue=max(peak, 1))
+    for v in skip:
+        del dist[v]
+    return dist, parent
+
+
+def dijkstra(store, start, goal=None, stats=None, skip=()):
+    """
+    與 main.dijkstra 相同的介面：回傳以名稱為 key 的 (dist, prev)。
+    只含搜尋途中走到過的星球 (不在 dist 裡的星球視為 inf)。
+    """
+    s = planet_id(store, start)
+    if s == -1:
+        return {}, {}
+    t = planet_id(store, goal) if goal is not None else -1
+    skip_ids = [i for i in (planet_id(store, name) for name in skip) if i != -1]
+    dist, parent = dijkstra_ids(store, s, (t,) if t != -1 else (), stats, skip_ids)
+    names = names_of(store, dist)
+    return ({names[v]: d for v, d in dist.items()},
+            {names[v]: (names[p] if p != -1 else None) for v, p in parent.items()})
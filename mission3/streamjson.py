@@ -0,0 +1,96 @@
+# streamjson.py
+# 增量式 space_map.json 讀取器
+#
+# 檔案以固定大小的區塊讀入，"planets" 與 "routes" 陣列的元素一個一個解碼後立刻交出，
+# 整份文件不會同時留在記憶體；峰值記憶體只和圖的大小有關，與 JSON 檔大小無關。
+
+import json
+
+_decoder = json.JSONDecoder()
+_WS = " \t\r\n"
+
+
+def iter_space_map(filename, chunk_size=1 << 16):
+    """
+    逐一產生 ("planet", name) 與 ("route", (from, to, fuel)) 事件。
+    其他頂層欄位 (例如 meta) 會被解碼後丟棄。
+    """
+    with open(filename, "r", encoding="utf-8") as f:
+        buf = ""
+        pos = 0
+        eof = False
+
+        def fill():
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def peek():
+            # 跳過空白，回傳下一個字元 (檔案結束則回傳 "")
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in _WS:
+                    pos += 1
+                if pos < len(buf):
+                    return buf[pos]
+                if not fill():
+                    return ""
+
+        def expect(ch):
+            nonlocal pos
+            got = peek()
+            if got != ch:
+                raise json.JSONDecodeError(f"Expecting '{ch}'", buf, pos)
+            pos += 1
+
+        def value():
+            # raw_decode 失敗或值剛好停在緩衝區尾端時，補讀資料再試一次
+            nonlocal pos
+            peek()
+            while True:
+                try:
+                    obj, end = _decoder.raw_decode(buf, pos)
+                    if end < len(buf) or eof:
+                        pos = end
+                        return obj
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                fill()
+
+        expect("{")
+        if peek() == "}":
+            return
+        while True:
+            key = value()
+            expect(":")
+            if key in ("planets", "routes") and peek() == "[":
+                pos += 1
+                if peek() == "]":
+                    pos += 1
+                else:
+                    while True:
+                        item = value()
+                        if key == "planets":
+                            yield "planet", item
+                        else:
+                            yield "route", (item["from"], item["to"], item["fuel"])
+                        sep = peek()
+                        pos += 1
+                        if sep == "]":
+                            break
+                        if sep != ",":
+                            raise json.JSONDecodeError("Expecting ',' or ']'", buf, pos - 1)
+            else:
+                value()
+            sep = peek()
+            pos += 1
+            if sep == "}":
+                return
+            if sep != ",":
+                raise json.JSONDecodeError("Expecting ',' or '}'", buf, pos - 1)